@@ -3,7 +3,12 @@ import main
 import os
 import pickle
 import sympy
+import mpmath
 from lhs_generators import create_standard_lhs
+import enumerate_over_signed_rcf
+from enumerate_over_signed_rcf import canonical_rational_form, LHSValueCache, SignedRcfEnumeration, \
+    esma_search_wrapper, LHS_BATCH_SIZE
+from lhs_file import read_lhs_header
 
 
 class APITests(unittest.TestCase):
@@ -62,6 +67,101 @@ class APITests(unittest.TestCase):
         self.assertIn([(sympy.E / (-2 + sympy.E)), [1, 1], [1, 0, 0, -1, 0, 0, -1, 0, 0, 1]], adjusted)
         print('Search results are as expected.')
 
+    def test_ESMA_api4(self): # Test search with multiprocessing, results should be identical to a single process.
+        cmd = 'ESMA -mode search -constant e -cycle_range 1 3 -poly_deg 1 -coeff_lim 2 -no_print'
+        parser = main.init_parser()
+        results = main.enumerate_over_signed_rcf_main(parser.parse_args(cmd.split(' ')))
+        parallel_results = main.enumerate_over_signed_rcf_main(parser.parse_args((cmd + ' -num_processes 3').split(' ')))
+        self.assertGreater(len(results), 0)
+        self.assertEqual(results, parallel_results)
+
+    def test_ESMA_api5(self): # Test search using an LHS enumeration file, whole and split in two.
+        path = './tmp_lhs_file'
+        create_standard_lhs(poly_deg=1, coefficients_limit=2, out_path=path, do_print=False)
+        count = read_lhs_header(path).count
+        parser = main.init_parser()
+        cmd = 'ESMA -mode search -constant e -cycle_range 2 2 -no_print -lhs ' + path
+        results = main.enumerate_over_signed_rcf_main(parser.parse_args(cmd.split(' ')))
+        split_results = []
+        for lhs_range in [[0, count // 2], [count // 2, count]]:
+            range_cmd = cmd + ' -lhs_range {} {}'.format(*lhs_range)
+            split_results += main.enumerate_over_signed_rcf_main(parser.parse_args(range_cmd.split(' ')))
+        enumerate_over_signed_rcf.LHS_BATCH_SIZE = 7  # the file is read in several batches
+        try:
+            batch_results = main.enumerate_over_signed_rcf_main(parser.parse_args(cmd.split(' ')))
+        finally:
+            enumerate_over_signed_rcf.LHS_BATCH_SIZE = LHS_BATCH_SIZE
+        os.remove(path)
+        self.assertEqual(len(results), 13)
+        self.assertEqual(split_results, results)
+        self.assertEqual(batch_results, results)
+        self.assertIn([(sympy.E / (sympy.E - 1)), [1, -1], [1, 0, -2, 0, 1]],
+                      [[res[0], res[1], list(res[3])] for res in results])
+
+    def test_ESMA_resume(self):  # A resumed search uses the saved results, also if the log ends with a partial record.
+        path = './tmp_search_log'
+        enum = SignedRcfEnumeration(sympy.E, [1, 2], coefficients_limit=2, poly_deg=1, do_print=False,
+                                    result_log=path)
+        results = enum.find_hits()
+        self.assertGreater(len(results[0]), 0)
+        enum.resume = True
+        self.assertEqual(enum.find_hits(), results)
+        with open(path, 'ab') as f:
+            f.write(b'\x80\x04\x95')
+        self.assertEqual(enum.find_hits(), results)
+        enum.max_cycle_len = 3
+        with self.assertRaises(ValueError):  # different search
+            enum.find_hits()
+        enum.max_cycle_len = 2
+        enum.lhs_source = ('other_lhs_file', (0, 10))
+        with self.assertRaises(ValueError):  # different LHS
+            enum.find_hits()
+        enum.resume = False
+        with self.assertRaises(FileExistsError):  # the log is kept
+            enum.find_hits()
+        enum.overwrite_log = True
+        self.assertEqual(enum.find_hits(), results)
+        os.remove(path)
+        with self.assertRaises(ValueError):
+            esma_search_wrapper(sympy.E, None, 1, 2, [1, 2], None, None, do_print=False, resume=True)
+
+    def test_verify_tiers(self):  # The cheap verification tiers don't change the verified results.
+        enum = SignedRcfEnumeration(sympy.E, [1, 2], coefficients_limit=2, poly_deg=1, do_print=False)
+        results = enum.find_hits()
+        counts = enum.verify_counts
+        self.assertEqual(len(counts), len(enum.verify_tiers) + 1)
+        self.assertGreater(counts[0][1], 0)
+        self.assertEqual([passed for passed, _ in counts[:-1]], [sum(count) for count in counts[1:]])
+        enum.verify_tiers = []
+        self.assertEqual(enum.find_hits(), results)
+
+    def test_verify_tiers_slow_convergence(self):  # A result verified with few digits to spare passes every tier.
+        enum = SignedRcfEnumeration(sympy.E, [1, 2], do_print=False)
+        for depth, _, digits in enum.verify_tiers:
+            self.assertLessEqual(digits / depth, 100 / enum.verify_depth / 2)
+        # 1 + 1/(1 - 1/(1 - 1/(1 + 1/(1 - ...)))) is the golden ratio, but only to ~104 digits with 1000 terms
+        res = [(1 + sympy.sqrt(5)) / 2, [1, -1, -1, -1], [1], [1, -1]]
+        with mpmath.workdps(enum.verify_dps):
+            self.assertEqual(enum.verify_result(res)[1], len(enum.verify_tiers) + 1)
+
+    def test_canonical_lhs(self):  # Equivalent rational LHS (up to sign) must have the same canonical form.
+        form = canonical_rational_form([1, 1, 0], [0, 1, 1])  # (1 + x) / (x + x^2) = 1 / x
+        self.assertEqual(form, canonical_rational_form([-2, 0, 0], [0, 2, 0]))
+        self.assertEqual(form, canonical_rational_form([0, -1, 0], [0, 0, -1]))
+        self.assertNotEqual(form, canonical_rational_form([1, 0, 0], [0, 0, 1]))
+        self.assertIsNone(canonical_rational_form([2, 2], [-1, -1]))
+
+    def test_lhs_cache(self):  # Values are computed once per (expression, precision).
+        cache = LHSValueCache()
+        value = cache.get(sympy.E / (sympy.E - 1), 50)
+        self.assertIs(cache.get(sympy.E / (sympy.E - 1), 50), value)
+        self.assertEqual(len(cache.values), 1)
+        self.assertEqual(mpmath.nstr(cache.get(sympy.E / (sympy.E - 1), 100), 45), mpmath.nstr(value, 45))
+        cache = LHSValueCache(max_size=2)
+        for var in [sympy.E, sympy.E + 1, sympy.E, sympy.E + 2]:
+            cache.get(var, 50)
+        self.assertEqual(list(cache.values), [(sympy.E, 50), (sympy.E + 2, 50)])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from massey import massey, batch_massey, BerlekampMassey
+from enumerate_over_signed_rcf import create_series_from_shift_reg, remove_redundant_cycles
+
+
+class MasseyTests(unittest.TestCase):
+
+    def test_known_lfsr(self):
+        fibonacci = create_series_from_shift_reg([1, -1, -1], [1, 1], 40)
+        self.assertEqual(list(massey(fibonacci, 199)), [1, -1, -1])
+        # a_n = n for even n, a_n = 2 for odd n (the kind of series ESMA finds)
+        interlaced = [n if n % 2 == 0 else 2 for n in range(1, 41)]
+        self.assertEqual(list(massey(interlaced, 199)), [1, 0, -2, 0, 1])
+
+    def test_batch(self):
+        lines = [create_series_from_shift_reg([1, -2, 1], [3, 5], 30),
+                 create_series_from_shift_reg([1, 0, 0, -1], [4, -7, 9], 30),
+                 [1, 5, 2, 8, 3, 3, 1, 7, 4, 2],
+                 []]
+        self.assertEqual([list(lfsr) for lfsr in batch_massey(lines, 199)],
+                         [list(massey(line, 199)) for line in lines])
+        self.assertEqual(list(batch_massey(lines, 199)[1]), [1, 0, 0, -1])
+
+    def test_large_prime(self):
+        # large terms and a prime without an inverse table
+        line = create_series_from_shift_reg([1, -3, 1], [10 ** 30, 7], 30)
+        self.assertEqual(list(massey(line, 2 ** 31 - 1)), [1, -3, 1])
+        engine = BerlekampMassey(2 ** 31 - 1, 30)
+        for term in line:
+            engine.feed([term])
+        self.assertEqual(engine.lengths[0], 2)
+
+    def test_redundant_cycles(self):
+        sign_seqs = [(-1,), (1,), (-1, -1), (-1, 1), (1, -1), (1, 1), (-1, 1, -1, 1), (1, 1, 1, -1)]
+        self.assertEqual(remove_redundant_cycles(sign_seqs), [(-1,), (1,), (-1, 1), (1, -1), (1, 1, 1, -1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,20 @@ import os
 import pickle
 from time import time
 import itertools
+import multiprocessing
+import numpy
+from collections import OrderedDict
+from copy import copy
 import mpmath
 import sympy
-from sympy import lambdify, Rational
-from massey import slow_massey
+from sympy import lambdify
+from massey import BerlekampMassey
 from EfficientGCF import EfficientGCF
-from ramanujan.utils.mobius import GeneralizedContinuedFraction
-from ramanujan.utils.convergence_rate import calculate_convergence
+from result_log import ResultLog
+from ramanujan.utils.mobius import GeneralizedContinuedFraction, PartialQuotientExtractor
+from ramanujan.utils.utils import get_reduced_fraction, create_linear_recurrence_series, \
+    create_linear_recurrence_series_batch
+from ramanujan.utils.convergence_rate import calculate_convergence_rates
 
 """
 Some important terminology:
@@ -18,6 +25,12 @@ LHS - Some parametric function f(constant, coefficients). By default, rational f
       However, any parametric function can be used by writing a fitting generator (See lhs_generators.py)
 """
 
+# name of the search log in the output directory of esma_search_wrapper (see result_log.py and search_log_name)
+SEARCH_LOG_NAME = 'search_log'
+DEFAULT_LHS_CACHE_SIZE = 1024  # number of LHS values kept by LHSValueCache
+LHS_BATCH_SIZE = 2 ** 14  # number of LHS read into memory at a time when searching (see find_signed_rcf_conj)
+
+
 def clear_end_zeros(items):
     """
     removes zeros at end of list.
@@ -29,6 +42,90 @@ def clear_end_zeros(items):
         items.pop()
 
 
+def remove_redundant_cycles(sign_seqs):
+    """
+    removes sign periods that are repetitions of a shorter sign period that appears before them (e.g. [1, -1, 1, -1]
+    after [1, -1]), as they create the same b_ series.
+    :param sign_seqs: sign periods, ordered by length.
+    :return: list of the non redundant sign periods, in the same order.
+    """
+    redundant_cycles = set()
+    non_redundant = []
+    for sign_period in sign_seqs:
+        if tuple(sign_period) in redundant_cycles:
+            continue
+        non_redundant.append(sign_period)
+        for i in range(2, (len(sign_seqs[-1]) // len(sign_period)) + 1):
+            redundant_cycles.add(tuple(sign_period) * i)
+    return non_redundant
+
+
+# the SignedRcfEnumeration of the current worker process (see SignedRcfEnumeration.create_pool)
+_worker_enumeration = None
+
+
+def _init_worker(enumeration):
+    global _worker_enumeration
+    _worker_enumeration = enumeration
+
+
+def _extract_pretty_series_worker(args):
+    lhs, sign_seqs = args
+    return _worker_enumeration.extract_pretty_series(_worker_enumeration.lhs_expression(lhs), sign_seqs)
+
+
+def _verify_result_worker(args):
+    return _worker_enumeration.verify_result(*args)
+
+
+class LHSValueCache(object):
+    def __init__(self, max_size=DEFAULT_LHS_CACHE_SIZE):
+        """
+        Numeric values of LHS expressions, keyed by (expression, dps).
+        Every LHS is lambdified and evaluated once per precision, and the value is shared by all sign periods and by
+        the search, verification and printing stages. Values are used again soon after they are computed (by the other
+        sign periods, or the other verification tiers of a result), so only the last max_size values are kept.
+        :param max_size: maximum number of values to keep.
+        """
+        self.max_size = max_size
+        self.values = OrderedDict()
+
+    def get(self, var, dps):
+        """
+        :param var: sympy expression of the LHS.
+        :param dps: decimal precision of the value.
+        :return: mpf value of var.
+        """
+        key = (var, dps)
+        if key in self.values:
+            self.values.move_to_end(key)
+            return self.values[key]
+        with mpmath.workdps(dps):
+            value = lambdify((), var, modules="mpmath")()
+        self.values[key] = value
+        if len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+        return value
+
+
+def canonical_rational_form(numerator, denominator):
+    """
+    canonical form of the rational function P(c)/Q(c), up to its sign (the LHS enumeration only keeps abs values).
+    P and Q are divided by their polynomial gcd and their common content, the sign of Q is normalized by
+    get_reduced_fraction, and the sign of P is chosen to give the smaller tuple.
+    :param numerator: numerator polynomial coefficients where numerator[0] is the free coefficient.
+    :param denominator: denominator polynomial coefficients where denominator[0] is the free coefficient.
+    :return: hashable (numerator, denominator) tuples of the same length as the input, or None if P/Q is a rational
+             number (independent of the constant).
+    """
+    deg = max(len(numerator), len(denominator)) - 1
+    numer, denom = get_reduced_fraction(numerator, denominator, deg)
+    if not any(numer[1:]) and not any(denom[1:]):
+        return None
+    numer = min(tuple(numer), tuple(-coef for coef in numer))
+    return numer, tuple(denom)
+
+
 def create_series_from_shift_reg(poly_a, initials, n):
     """
     this is the reversed action to the massey algorithm.
@@ -41,21 +138,14 @@ def create_series_from_shift_reg(poly_a, initials, n):
     """
     assert ((len(poly_a) - len(initials)) == 1), 'There should be deg(poly) initial conditions'
     assert (len(poly_a) > 0) and (poly_a[0] == 1), 'Illegal polynomial - first coefficient must be 1'
-    a_ = []
-    for i in range(len(initials)):
-        a_.append(initials[i])
-    for i in range(len(a_), n):
-        a_i = 0
-        for j in range(1, len(poly_a)):
-            a_i -= poly_a[j] * a_[i - j]
-        a_.append(a_i)
-    return a_
+    return create_linear_recurrence_series(poly_a, initials, n)
 
 
 class SignedRcfEnumeration(object):
 
     def __init__(self, sym_constant, cycle_len_range, depth=100, coefficients_limit=None, poly_deg=None, min_deg=None,
-                 prime=199, custom_enum=None, do_print=True):
+                 prime=199, confirm_primes=(65521,), custom_enum=None, lhs_coefs=None, do_print=True, num_processes=1,
+                 result_log=None, resume=False, overwrite_log=False, lhs_source=None):
         """
         Initialize search engine.
         Basically, this is a 3 step procedure:
@@ -74,8 +164,19 @@ class SignedRcfEnumeration(object):
         :param poly_deg: Maximum degree of numerator and denominator polynomials in the rational LHS.
         :param min_deg: Used to exclude lower degree numerator and denominator polynomials in rational LHS from search.
         :param prime: Prime number in use by Massey algorithm.
+        :param confirm_primes: More primes to run Massey with. Hits must have a short LFSR over all of them.
         :param custom_enum: A ready-made enumeration that only requires substituting a variable 'x' with the constant.
+        :param lhs_coefs: A ready-made rational enumeration, as (numerator, denominator) coefficient tuples: a list, or
+                          an LHSFileSlice that is read lazily (see lhs_file.py). Sympy expressions are only created
+                          when they are searched.
         :param do_print: Print outputs (Used as False primarily for unit tests).
+        :param num_processes: Number of processes to search and verify with.
+        :param result_log: (optional) path of a log to save the search progress and results to, while searching (see
+                           result_log.py).
+        :param resume: Continue the search saved in result_log (if it exists) instead of starting over.
+        :param overwrite_log: Start over even if result_log exists (otherwise FileExistsError is raised).
+        :param lhs_source: (optional) identifies the LHS enumeration, e.g. (path of the LHS file, range of LHS
+                           searched). Saved in the result log, so a search is only resumed on the same LHS.
         """
         self.enum_dps = 500
         self.verify_dps = 1000
@@ -98,9 +199,23 @@ class SignedRcfEnumeration(object):
         sequences with shorter LFSR will be considered as a possible valuable result.
         """
         self.verify_depth = 1000
+        # Cheap verification tiers (depth, dps, digits), checked before the full verification (verify_depth,
+        # verify_dps, 100 digits). Most false results already differ from their LHS in the first digits. Digits per
+        # term of every tier are at most half of the full verification's, so a result that converges (at least
+        # linearly) fast enough to be verified also passes the tiers.
+        self.verify_tiers = [(200, 30, 10), (500, 80, 25)]
+        self.verify_counts = []
         self.prime = prime
+        self.primes = [prime] + list(confirm_primes)
         self.custom_enum = custom_enum
+        self.lhs_coefs = lhs_coefs
         self.do_print = do_print
+        self.num_processes = num_processes
+        self.result_log = result_log
+        self.resume = resume
+        self.overwrite_log = overwrite_log
+        self.lhs_source = lhs_source
+        self.lhs_cache = LHSValueCache()
 
     def create_sign_seq_enumeration(self):
         """
@@ -129,10 +244,25 @@ class SignedRcfEnumeration(object):
             denom_sym += denominator[i]*(self.const_sym**i)
         return numer_sym/denom_sym
 
+    def lhs_expression(self, lhs):
+        """
+        :param lhs: sympy expression, or (numerator, denominator) coefficient tuples of a rational LHS.
+        :return: sympy expression of the LHS. Rational LHS are saved as positive expressions.
+        """
+        if isinstance(lhs, tuple):
+            return abs(self.create_rational_symbol(*lhs))
+        return lhs
+
     def create_rational_variations_enum(self):
         """
-        Creates a list of all possible rational expressions for the LHS.
-        Expressions saved as sympy-simplified, positive expressions to reduce redundancy.
+        Creates a set of all possible rational expressions for the LHS (see create_rational_coefficients_enum).
+        """
+        return {self.lhs_expression(lhs) for lhs in self.create_rational_coefficients_enum()}
+
+    def create_rational_coefficients_enum(self):
+        """
+        Creates a list of all possible rational functions for the LHS, as (numerator, denominator) coefficient tuples.
+        Variations are reduced to a canonical form (see canonical_rational_form) to reduce redundancy.
         Additional checks are performed to exclude degenerated cases.
         """
         if self.do_print:
@@ -151,126 +281,237 @@ class SignedRcfEnumeration(object):
             numerators = [list(numer) for numer in list(itertools.product(coeffs, repeat=self.poly_deg+1))]
             denominators = [list(denom) for denom in list(itertools.product(coeffs, repeat=self.poly_deg+1))]
         variations = itertools.product(numerators, denominators)
-        expressions = set()
+        canonical_forms = set()
         cnt = 0
         mytimer= time()
         for var in variations:
-            if ((cnt % 1000) == 0) and (cnt != 0) and self.do_print:
+            if ((cnt % 100000) == 0) and (cnt != 0) and self.do_print:
                 print("{} variations took {} minutes".format(cnt, round((time()-mytimer)/60, 2)))
             cnt += 1
             numer = var[0]
             denom = var[1]
             if (denom == [0 for i in denom]) or (numer == [0 for i in numer]):
                 continue
-            var_sym = self.create_rational_symbol(numer, denom)
-            var_sym = sympy.simplify(var_sym)
-            if isinstance(var_sym, Rational):  # Simplified expression is a rational number (independant of constant).
+            canonical_form = canonical_rational_form(numer, denom)
+            if canonical_form is None:  # Expression is a rational number (independant of constant).
                 continue
-            if abs(var_sym) not in expressions:
-                expressions.add(abs(var_sym))
+            canonical_forms.add(canonical_form)
         if self.do_print:
             ("Finished enumerations. Took {}  seconds".format(round(time()-start, 2)))
-        return expressions
+        return sorted(canonical_forms)
 
-    def find_signed_rcf_conj(self):
+    def create_pool(self):
+        """
+        Creates a pool of self.num_processes workers. Every worker gets a copy of this object, without the LHS
+        enumeration and the lambdified constant (which can't be pickled).
+        """
+        lean_enumeration = copy(self)
+        lean_enumeration.custom_enum = None
+        lean_enumeration.lhs_coefs = None
+        lean_enumeration.const_val = None
+        lean_enumeration.lhs_cache = LHSValueCache()
+        return multiprocessing.Pool(self.num_processes, initializer=_init_worker, initargs=(lean_enumeration,))
+
+    def find_signed_rcf_conj(self, pool=None):
         """
         Builds the final domain.
         Iterates throgh the domain:
         extraction->massey->check->save.
         Additional checks are performed to exclude degenerated cases.
         If a generic enumeration is given will use it instead of enumerating.
+        Sign periods are pruned of redundant cycles before searching, so the domain can be split between processes
+        by LHS (every LHS is searched with all sign periods in one process).
+        If a result log is used, the search progress is saved to it, and a resumed search skips the LHS that were
+        already searched. This requires the LHS order to be the same in every run, so a custom enumeration is sorted.
+        The LHS are searched in batches of LHS_BATCH_SIZE, so lhs_coefs may be read lazily (e.g. an LHSFileSlice).
+        :param pool: (optional) process pool to search with (see create_pool).
         """
         inter_results = []
-        redundant_cycles = set()
         # Enumerate:
-        if self.custom_enum is None:
-            lhs = self.create_rational_variations_enum()
+        if self.lhs_coefs is not None:
+            lhs = self.lhs_coefs
+        elif self.custom_enum is None:
+            lhs = self.create_rational_coefficients_enum()
         else:
             if self.do_print:
                 print("Substituting " + str(self.const_sym) + ' into generic LHS:')
             strt = time()
-            lhs = [var.subs({sympy.symbols('x'): self.const_sym}) for var in self.custom_enum]
+            custom_enum = self.custom_enum if self.result_log is None else sorted(self.custom_enum, key=str)
+            lhs = [var.subs({sympy.symbols('x'): self.const_sym}) for var in custom_enum]
             if self.do_print:
                 print("Took {} sec".format(time() - strt))
-        sign_seqs = []
-        for cyc_len in range(self.min_cycle_len, self.max_cycle_len + 1):
-            sign_seqs = sign_seqs + list(itertools.product([-1, 1], repeat=cyc_len))
+        sign_seqs = self.create_sign_seq_enumeration()
         domain_size = len(lhs) * len(sign_seqs)
         if self.do_print:
             print("De-Facto Domain Size is: {}\n Starting preliminary search...".format(domain_size))
+        sign_seqs = remove_redundant_cycles(sign_seqs)
+        log = None
+        if self.result_log is not None:
+            header = (str(self.const_sym), self.min_cycle_len, self.max_cycle_len, self.depth, self.primes,
+                      self.coeff_lim, self.poly_deg, self.min_deg, self.lhs_source, len(lhs))
+            log = ResultLog(self.result_log, header, self.resume, self.overwrite_log)
+            inter_results = list(log.results)
+            if self.do_print and log.lhs_done > 0:
+                print("Resuming search: {} of {} LHS were already searched, {} possible results found".format(
+                    log.lhs_done, len(lhs), len(inter_results)))
+        lhs_done = 0 if log is None else log.lhs_done
         checkpoint = max(domain_size // 20, 5)
-        count = 0
         start = time()
-        # Iterate
-        bad_variation = []
-        for instance in itertools.product(lhs, sign_seqs):
-            count += 1
-            var, sign_period = instance[0], list(instance[1])
-            if var == bad_variation:
-                continue
-            bad_variation = []
-            if ''.join([str(c) for c in sign_period]) in redundant_cycles:
-                continue
-            # if this cycle was not redundant it renders some future cycles redundant:
-            for i in range(2, (self.max_cycle_len // len(sign_period)) + 1):
-                redun = sign_period * i
-                redundant_cycles.add(''.join([str(c) for c in redun]))
-            var_gen = lambdify((), var, modules="mpmath")
-            seq_len = len(sign_period)
-            if (count % checkpoint == 0) and (self.do_print):
-                print("\n{}% of domain searched.".format(round(100 * count / domain_size, 2)))
-                print("{} possible results found".format(len(inter_results)))
-                print("{} minutes passed.\n".format(round((time() - start) / 60, 2)))
-            b_ = (sign_period * ((self.depth // seq_len) + 1))  # Concatenate periods to form sequence.
-            b_ = b_[:self.depth]  # Cut to proper size.
-            with mpmath.workdps(self.enum_dps):
-                try:
-                    signed_rcf = GeneralizedContinuedFraction.from_irrational_constant(const_gen=var_gen, b_=b_)
-                except ZeroDivisionError:
-                    if self.do_print:
-                        print('lhs:')
-                    sympy.pprint(var)
-                    bad_variation = var
-                    continue
-            a_ = signed_rcf.a_
-            if 0 in a_:
-                continue
-            if len(a_) < self.depth:
+        try:
+            # Iterate
+            lhs_iter = itertools.islice(lhs, lhs_done, None)
+            for batch_start in range(lhs_done, len(lhs), LHS_BATCH_SIZE):
+                batch = list(itertools.islice(lhs_iter, LHS_BATCH_SIZE))
+                if pool is None:
+                    lhs_results = (self.extract_pretty_series(self.lhs_expression(var), sign_seqs) for var in batch)
+                else:
+                    chunk_size = max(len(batch) // (20 * self.num_processes), 1)
+                    lhs_results = pool.imap(_extract_pretty_series_worker, ((var, sign_seqs) for var in batch),
+                                            chunk_size)
+                for var_num, (var, var_results) in enumerate(zip(batch, lhs_results), batch_start):
+                    count = (var_num + 1) * domain_size // len(lhs)  # all sign periods of var are searched together
+                    if (count // checkpoint != (count - domain_size // len(lhs)) // checkpoint) and self.do_print:
+                        print("\n{}% of domain searched.".format(round(100 * count / domain_size, 2)))
+                        print("{} possible results found".format(len(inter_results)))
+                        print("{} minutes passed.\n".format(round((time() - start) / 60, 2)))
+                    if var_results:
+                        var = self.lhs_expression(var)
+                    var_results = [[var, sign_period, a_[:(len(a_lfsr)-1)], a_lfsr]
+                                   for sign_period, a_, a_lfsr in var_results]
+                    inter_results += var_results
+                    if log is not None:
+                        log.add(var_num + 1, var_results)
+        finally:
+            if log is not None:
+                log.close()
+        return inter_results
+
+    def extract_pretty_series(self, var, sign_seqs):
+        """
+        Extracts the a_ series of var for all sign periods together, one term at a time, and feeds every term to
+        Berlekamp-Massey over all primes. A series is dropped as soon as its LFSR (over any prime) reaches the beauty
+        standard, or a zero term appears, so most series are only extracted to a fraction of the depth.
+        Sign periods whose b_ series start the same way share the extraction (a trie over the b_ series): every node
+        holds the extraction state of one b_ prefix, and it is copied only where the b_ series split.
+        If the extraction fails (rational or degenerate LHS), the failing sign period and the ones after it are skipped.
+        :param var: sympy expression of the LHS.
+        :param sign_seqs: sign periods (without redundant ones).
+        :return: list of [sign_period, a_, a_LFSR] of the series with short LFSRs (the LFSR is over self.prime).
+        """
+        var_val = self.lhs_cache.get(var, self.enum_dps)
+        b_series = [(list(sign_period) * ((self.depth // len(sign_period)) + 1))[:self.depth]
+                    for sign_period in sign_seqs]
+        engines = [BerlekampMassey(p, self.depth, len(sign_seqs)) for p in self.primes]
+        series = [[] for _ in sign_seqs]
+        alive = numpy.ones(len(sign_seqs), dtype=bool)
+        nodes = [0] * len(sign_seqs)  # trie node of every sign period in the current depth
+        with mpmath.workdps(self.enum_dps):
+            extractors = [PartialQuotientExtractor(lambda: var_val)]  # one for every node, starting with the root
+            for depth in range(self.depth):
+                # children of every node, by the next item of b_. ordered by their first sign period
+                children = {}
+                for i in numpy.flatnonzero(alive):
+                    children.setdefault(nodes[i], {}).setdefault(b_series[i][depth], []).append(i)
+                terms = [0] * len(sign_seqs)
+                next_extractors = []
+                for node, node_children in children.items():
+                    for child_num, (b_i, rows) in enumerate(node_children.items()):
+                        if not alive[rows[0]]:
+                            continue
+                        extractor = extractors[node]
+                        if child_num < len(node_children) - 1:  # the last child can take over the parent's state
+                            extractor = extractor.copy()
+                        try:
+                            a_i = extractor.extract(b_i)
+                        except ZeroDivisionError:
+                            if self.do_print:
+                                print('lhs:')
+                            sympy.pprint(var)
+                            alive[rows[0]:] = False
+                            break
+                        if a_i == 0:
+                            alive[rows] = False
+                            continue
+                        for i in rows:
+                            nodes[i] = len(next_extractors)
+                            series[i].append(a_i)
+                            terms[i] = a_i
+                        next_extractors.append(extractor)
+                extractors = next_extractors
+                for engine in engines:
+                    engine.feed(terms)
+                    alive &= engine.lengths < self.beauty_standard
+                if not alive.any():
+                    break
+        results = []
+        for i, sign_period in enumerate(sign_seqs):
+            if not alive[i]:
                 continue
-            a_lfsr = list(slow_massey(a_, self.prime))
+            a_lfsr = list(engines[0].lfsr(i))
             clear_end_zeros(a_lfsr)
             if len(a_lfsr) < self.beauty_standard:
-                inter_results.append([var, sign_period, a_[:(len(a_lfsr)-1)], a_lfsr])
-        return inter_results
+                results.append([list(sign_period), series[i], a_lfsr])
+        return results
 
-    def verify_results(self, results):
+    def verify_result(self, res, a_=None):
+        """
+        Validate a single intermediate result to 100 digit precision, after checking it with the cheap verification
+        tiers (see verify_tiers).
+        :param a_: (optional) the a_ series of the result, verify_depth terms long.
+        :return: The value of the LHS as a string of 100 digits (or None if the GCF does not converge to it), and the
+                 number of tiers passed (including the full verification).
+        """
+        if a_ is None:
+            a_ = create_series_from_shift_reg(res[3], res[2], self.verify_depth)
+        b_ = (res[1] * ((self.verify_depth // len(res[1])) + 1))
+        b_ = b_[:self.verify_depth]
+        for tier, (depth, dps, digits) in enumerate(self.verify_tiers):
+            with mpmath.workdps(dps):
+                lhs_val = self.lhs_cache.get(res[0], dps)
+                rhs_val = EfficientGCF(a_[:depth], b_[:depth]).evaluate()
+                if abs(rhs_val - lhs_val) > abs(lhs_val) * mpmath.mpf(10) ** -digits:
+                    return None, tier
+        gcf = EfficientGCF(a_, b_)
+        with mpmath.workdps(self.verify_dps):
+            lhs_str = mpmath.nstr(self.lhs_cache.get(res[0], self.verify_dps), 100)
+            rhs_val = gcf.evaluate()
+            rhs_str = mpmath.nstr(rhs_val, 100)
+        if rhs_str != lhs_str:
+            return None, len(self.verify_tiers)
+        return lhs_str, len(self.verify_tiers) + 1
+
+    def verify_results(self, results, pool=None):
         """
         Validate intermediate results to 100 digit precision
         If a numeric value appears multiple times, the first is kept as valid. The rest saved as recurring for later.
+        The a_ series of all results are generated together (see create_linear_recurrence_series_batch).
+        The number of results that passed and failed every verification tier is saved to verify_counts.
+        :param pool: (optional) process pool to validate with (see create_pool).
         """
+        series = create_linear_recurrence_series_batch([res[3] for res in results], [res[2] for res in results],
+                                                       self.verify_depth)
+        if pool is None:
+            verified = [self.verify_result(res, a_) for res, a_ in zip(results, series)]
+        else:
+            verified = pool.map(_verify_result_worker, zip(results, series),
+                                max(len(results) // (4 * self.num_processes), 1))
+        keys = [key for key, _ in verified]
+        tiers_passed = [passed for _, passed in verified]
+        self.verify_counts = []  # (passed, failed) for every tier, and the full verification
+        for tier in range(len(self.verify_tiers) + 1):
+            self.verify_counts.append((sum(1 for passed in tiers_passed if passed > tier), tiers_passed.count(tier)))
         verified_results = []
         recurring_value_results = {}
         res_set = set()
-        for res in results:
-            var_gen = lambdify((), res[0], modules="mpmath")
-            a_ = create_series_from_shift_reg(res[3], res[2], self.verify_depth)
-            b_ = (res[1] * ((self.verify_depth // len(res[1])) + 1))
-            b_ = b_[:self.verify_depth]
-            gcf = EfficientGCF(a_, b_)
-            with mpmath.workdps(self.verify_dps):
-                lhs_str = mpmath.nstr(var_gen(), 100)
-                rhs_val = gcf.evaluate()
-                rhs_str = mpmath.nstr(rhs_val, 100)
-                if rhs_str != lhs_str:
-                    continue
-                key = lhs_str
+        for res, key in zip(results, keys):
+            if key is None:
+                continue
             if key not in res_set:
                 res_set.add(key)
                 verified_results.append(res)
                 recurring_value_results[key] = []
             else:
                 recurring_value_results[key].append(res)
-                continue
         return verified_results, recurring_value_results
 
     def print_results(self, results, latex=True):
@@ -279,23 +520,26 @@ class SignedRcfEnumeration(object):
         :param results: verified results.
         :param latex: LaTex printing flag.
         """
-        for res_num, res in enumerate(results):
+        gcfs = []
+        lhs_vals = []
+        for res in results:
+            a_ = create_series_from_shift_reg(res[3], res[2], self.depth)
+            b_ = (res[1] * (self.depth // len(res[1])))[:self.depth]
+            gcfs.append(GeneralizedContinuedFraction(a_, b_))
+            lhs_vals.append(self.lhs_cache.get(res[0], self.verify_dps))
+        rates = calculate_convergence_rates(gcfs, lhs_vals)
+        for res_num, (res, gcf, lhs_val, rate) in enumerate(zip(results, gcfs, lhs_vals, rates)):
             var_sym = res[0]
             lfsr = res[3]
             cycle = res[1]
             initials = res[2]
-            var_gen = lambdify((), var_sym, modules="mpmath")
-            a_ = create_series_from_shift_reg(lfsr, initials, self.depth)
-            b_ = (cycle * (self.depth // len(cycle)))[:self.depth]
-            gcf = GeneralizedContinuedFraction(a_, b_)
-            rate = calculate_convergence(gcf, lambdify((), var_sym, 'mpmath')())
             if not latex:
                 print(str(res_num))
                 print('lhs: ')
                 sympy.pprint(var_sym)
                 print('rhs :')
                 gcf.print(8)
-                print('lhs value: ' + mpmath.nstr(var_gen(), 50))
+                print('lhs value: ' + mpmath.nstr(lhs_val, 50))
                 print('rhs value: ' + mpmath.nstr(gcf.evaluate(), 50))
                 print('a_n LFSR: {},\n With initialization: {}'.format(lfsr, initials))
                 print('b_n period: ' + str(cycle))
@@ -315,32 +559,60 @@ class SignedRcfEnumeration(object):
         (The duplicates might prove useful later if we can find different sign series leading to different a series for
         same variation.)
         """
-        with mpmath.workdps(self.enum_dps):
-            start = time()
-            # Search
-            results = self.find_signed_rcf_conj()
-            end = time()
-            if self.do_print:
-                print('That took {}s'.format(end - start))
-        with mpmath.workdps(self.verify_dps):
-            if self.do_print:
-                print('Starting to verify results...')
-            start = time()
-            # Validate
-            verified_results, recurring_value_results = self.verify_results(results)
-            end = time()
-            if self.do_print:
-                print('{} results were verified.\nThat took {}'.format(len(verified_results), end - start))
-            # Print if requested:
-            if self.do_print:
-                self.print_results(verified_results)
+        pool = self.create_pool() if self.num_processes > 1 else None
+        try:
+            with mpmath.workdps(self.enum_dps):
+                start = time()
+                # Search
+                results = self.find_signed_rcf_conj(pool)
+                end = time()
+                if self.do_print:
+                    print('That took {}s'.format(end - start))
+            with mpmath.workdps(self.verify_dps):
+                if self.do_print:
+                    print('Starting to verify results...')
+                start = time()
+                # Validate
+                verified_results, recurring_value_results = self.verify_results(results, pool)
+                end = time()
+                if self.do_print:
+                    tiers = self.verify_tiers + [(self.verify_depth, None, 100)]
+                    for (depth, _, digits), (passed, failed) in zip(tiers, self.verify_counts):
+                        print('{} digits with {} terms: {} passed, {} failed'.format(digits, depth, passed, failed))
+                    print('{} results were verified.\nThat took {}'.format(len(verified_results), end - start))
+                # Print if requested:
+                if self.do_print:
+                    self.print_results(verified_results)
+        except BaseException:
+            # e.g. KeyboardInterrupt, don't wait for the workers to finish their tasks
+            if pool is not None:
+                pool.terminate()
+            raise
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
         return verified_results, recurring_value_results
 
 
+def search_log_name(lhs_source=None):
+    """
+    Name of the search log in the output directory of esma_search_wrapper. Searches of different LHS enumerations or
+    ranges (e.g. shards of one LHS file that share an output directory) get different logs.
+    :param lhs_source: (path of the LHS enumeration, range of LHS searched or None), or None.
+    """
+    if lhs_source is None:
+        return SEARCH_LOG_NAME
+    path, lhs_range = lhs_source
+    parts = [SEARCH_LOG_NAME, os.path.basename(path)] + [str(i) for i in (lhs_range or [])]
+    return '_'.join(parts)
+
+
 def esma_search_wrapper(constant, custom_enum, poly_deg, coeff_lim,
-                   cycle_range, min_deg, depth, out_dir=None, do_print=True):
+                   cycle_range, min_deg, depth, out_dir=None, do_print=True, num_processes=1, lhs_coefs=None,
+                   resume=False, overwrite_log=False, lhs_source=None):
     """
-    A Wrapper for searching using ESMA (currently without multiprocessing).
+    A Wrapper for searching using ESMA.
     :param constant: sympy constant
     :param custom_enum: A ready-made enumeration that only requires substituting a variable 'x' with the constant. (opt)
     :param poly_deg: Maximum degree of numerator and denominator polynomials in the rational LHS.
@@ -350,21 +622,35 @@ def esma_search_wrapper(constant, custom_enum, poly_deg, coeff_lim,
     :param depth: Number of elements of a series to extract. Relates to length of typical LFSRs  of the consant. (opt)
     :param out_dir: Path of director to save result binaries. (opt)
     :param do_print: Print outputs (Used as False primarily for unit tests). (opt)
+    :param num_processes: Number of processes to search and verify with. (opt)
+    :param lhs_coefs: A ready-made rational enumeration, as (numerator, denominator) coefficient tuples. (opt)
+    :param resume: Continue an interrupted search, from the search log in out_dir. (opt)
+    :param overwrite_log: Start over even if out_dir has a search log of this search. (opt)
+    :param lhs_source: (path of the LHS enumeration, range of LHS searched or None), for the search log. (opt)
     :return: A list of results of the form [lhs(sympy), sign_period, a_initialization, a_LFSR].
              Dictionary, maps strings of values to lists of recurring results sharing value. (result format as above).
     """
+    if resume and not out_dir:
+        raise ValueError('resume requires out_dir, which holds the search log')
+    log_path = None
+    if out_dir:
+        if not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+        log_path = '/'.join([out_dir, search_log_name(lhs_source)])
     if depth is not None:
         enum = SignedRcfEnumeration(sym_constant=constant, cycle_len_range=cycle_range, depth=depth,
                                     coefficients_limit=coeff_lim, poly_deg=poly_deg, min_deg=min_deg,
-                                    custom_enum=custom_enum, do_print=do_print)
+                                    custom_enum=custom_enum, lhs_coefs=lhs_coefs, do_print=do_print,
+                                    num_processes=num_processes, result_log=log_path, resume=resume,
+                                    overwrite_log=overwrite_log, lhs_source=lhs_source)
     else:
         enum = SignedRcfEnumeration(sym_constant=constant, cycle_len_range=cycle_range, coefficients_limit=coeff_lim,
-                                    poly_deg=poly_deg, min_deg=min_deg, custom_enum=custom_enum, do_print=do_print)
+                                    poly_deg=poly_deg, min_deg=min_deg, custom_enum=custom_enum, lhs_coefs=lhs_coefs,
+                                    do_print=do_print, num_processes=num_processes, result_log=log_path,
+                                    resume=resume, overwrite_log=overwrite_log, lhs_source=lhs_source)
     result_list, recurring_results_dict = enum.find_hits()
     if out_dir:
         path = out_dir
-        if not os.path.isdir(path):
-            os.makedirs(path)
         dup = '/'.join([path, 'recurring_by_value_0'])
         res = '/'.join([path, 'res_list_0'])
         i = 1
@@ -376,6 +662,7 @@ def esma_search_wrapper(constant, custom_enum, poly_deg, coeff_lim,
             pickle.dump(result_list, f)
         with open(dup, 'wb') as f:
             pickle.dump(recurring_results_dict, f)
+        os.remove(log_path)  # the search is complete, nothing to resume
     return result_list, recurring_results_dict
 
 
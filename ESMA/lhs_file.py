@@ -0,0 +1,112 @@
+import struct
+from collections import namedtuple
+import numpy as np
+
+"""
+Compact binary file format for rational LHS enumerations (see SignedRcfEnumeration.create_rational_coefficients_enum).
+Instead of pickled sympy expressions, the file holds the integer coefficients of every LHS:
+    header - magic, format version, coefficients dtype, poly_deg, coefficients limit, number of records.
+    records - fixed size. numerator coefficients followed by denominator coefficients (poly_deg + 1 of each, the free
+              coefficient first), in the smallest signed integer type that holds the coefficients limit.
+Since records have a fixed size, any slice of the enumeration can be read directly by its file offset. This makes it
+easy to split one enumeration between several search jobs.
+"""
+
+LHS_FILE_MAGIC = b'ESMALHS'
+LHS_FILE_VERSION = 1
+HEADER_FORMAT = '<7sBBHIQ'  # magic, version, dtype code, poly_deg, coefficients limit, number of records
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+COEF_DTYPES = [np.dtype('<i1'), np.dtype('<i2'), np.dtype('<i4'), np.dtype('<i8')]
+READ_CHUNK_RECORDS = 2 ** 14
+
+LHSFileHeader = namedtuple('LHSFileHeader', 'version dtype poly_deg coeff_lim count')
+
+
+def _coef_dtype(coeff_lim):
+    for dtype in COEF_DTYPES:
+        if coeff_lim <= np.iinfo(dtype).max:
+            return dtype
+    raise ValueError('Coefficients limit is too large: {}'.format(coeff_lim))
+
+
+def record_size(header):
+    return 2 * (header.poly_deg + 1) * header.dtype.itemsize
+
+
+def record_offset(header, index):
+    """
+    :return: file offset of record number index.
+    """
+    return HEADER_SIZE + index * record_size(header)
+
+
+def write_lhs_file(path, lhs_coefs, poly_deg, coeff_lim):
+    """
+    Saves an LHS enumeration.
+    :param path: output file path.
+    :param lhs_coefs: list of (numerator, denominator) coefficient tuples, each of length poly_deg + 1.
+    :param poly_deg: Maximum degree of numerator and denominator polynomials.
+    :param coeff_lim: Limit for coefficients (symmetrical).
+    """
+    dtype = _coef_dtype(coeff_lim)
+    records = np.array([list(numer) + list(denom) for numer, denom in lhs_coefs], dtype=dtype)
+    with open(path, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, LHS_FILE_MAGIC, LHS_FILE_VERSION, COEF_DTYPES.index(dtype), poly_deg,
+                            coeff_lim, len(lhs_coefs)))
+        f.write(records.tobytes())
+
+
+def is_lhs_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(LHS_FILE_MAGIC)) == LHS_FILE_MAGIC
+
+
+def read_lhs_header(path):
+    """
+    :return: LHSFileHeader of the file.
+    """
+    with open(path, 'rb') as f:
+        magic, version, dtype_code, poly_deg, coeff_lim, count = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+    if magic != LHS_FILE_MAGIC:
+        raise ValueError('{} is not an LHS enumeration file'.format(path))
+    if version != LHS_FILE_VERSION:
+        raise ValueError('Unsupported LHS file version {} (expected {})'.format(version, LHS_FILE_VERSION))
+    return LHSFileHeader(version, COEF_DTYPES[dtype_code], poly_deg, coeff_lim, count)
+
+
+def iter_lhs_file(path, start=0, stop=None):
+    """
+    Lazily reads (a slice of) an LHS enumeration, a chunk of records at a time.
+    :param path: LHS file path.
+    :param start: index of first record to read.
+    :param stop: (optional) index after the last record to read.
+    :return: generator of (numerator, denominator) coefficient tuples.
+    """
+    header = read_lhs_header(path)
+    stop = header.count if stop is None else min(stop, header.count)
+    width = header.poly_deg + 1
+    with open(path, 'rb') as f:
+        f.seek(record_offset(header, start))
+        for chunk_start in range(start, stop, READ_CHUNK_RECORDS):
+            chunk_len = min(READ_CHUNK_RECORDS, stop - chunk_start)
+            records = np.fromfile(f, dtype=header.dtype, count=chunk_len * 2 * width).reshape(chunk_len, 2 * width)
+            for record in records.tolist():
+                yield tuple(record[:width]), tuple(record[width:])
+
+
+class LHSFileSlice(object):
+    """
+    A slice of an LHS enumeration that is read lazily (see iter_lhs_file) whenever it's iterated, so it can be searched
+    without loading it to memory (see SignedRcfEnumeration lhs_coefs).
+    """
+    def __init__(self, path, start=0, stop=None):
+        count = read_lhs_header(path).count
+        self.path = path
+        self.start = min(start, count)
+        self.stop = count if stop is None else max(min(stop, count), self.start)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        return iter_lhs_file(self.path, self.start, self.stop)
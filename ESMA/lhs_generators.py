@@ -1,8 +1,8 @@
 from time import time
-import pickle
 import itertools
 from sympy import Abs, symbols
 from enumerate_over_signed_rcf import SignedRcfEnumeration
+from lhs_file import write_lhs_file
 
 """
 The purpose of this file is to allow for the construction enumerations following a specific pattern. 
@@ -16,7 +16,7 @@ def create_standard_lhs(poly_deg, coefficients_limit, out_path=None, do_print=Tr
     to any constant.
     :param poly_deg: Degree of polynomials in rational function.
     :param coefficients_limit: Limit for coefficients (symmetrical).
-    :param out_dir: Directory for saving the binary LHS enumeration.
+    :param out_path: Path for saving the LHS enumeration, as integer coefficients (see lhs_file.py).
     :return: List of standard generic LHS enumerations that can later be used for enumerating over any constant.
     """
     if do_print:
@@ -25,10 +25,10 @@ def create_standard_lhs(poly_deg, coefficients_limit, out_path=None, do_print=Tr
     x = symbols('x')
     enum = SignedRcfEnumeration(sym_constant=x, cycle_len_range=None, coefficients_limit=coefficients_limit,
                                 poly_deg=poly_deg, do_print=do_print)
-    generic_variations = enum.create_rational_variations_enum()
+    lhs_coefs = enum.create_rational_coefficients_enum()
     if out_path is not None:
-        with open(out_path, 'wb') as file:
-            pickle.dump(generic_variations, file)
+        write_lhs_file(out_path, lhs_coefs, poly_deg, coefficients_limit)
+    generic_variations = {enum.lhs_expression(lhs) for lhs in lhs_coefs}
     if do_print:
         print("Finished. Took {} sec".format(time() - strt))
     return generic_variations
@@ -3,11 +3,11 @@ import sys
 import argparse
 import pickle
 import lhs_generators
-import ramanujan.constants  # declares constants as sympy Singeltons, "not" used is intended
 
 from time import time
 from enumerate_over_signed_rcf import esma_search_wrapper
-from ramanujan.constants import g_const_dict
+from lhs_file import is_lhs_file, read_lhs_header, LHSFileSlice
+from ramanujan.constants import g_const_dict  # also registers the sympy constants (e.g. S.Khinchin)
 
 
 def get_lhs_generator(generator_name, args):
@@ -59,6 +59,14 @@ Currently the you can use only this enumerator:
     srcf_parser.add_argument('-depth', type=int, nargs='?', default=None, const=None,
                              help='In case depth needs to be changed (if insufficient precision error repeats)')
     srcf_parser.add_argument('-no_print', action='store_true')
+    srcf_parser.add_argument('-lhs_range', type=int, nargs=2, default=None,
+                             help='First and last (excluded) indices of the LHS enumeration file to search')
+    srcf_parser.add_argument('-num_processes', type=int, nargs='?', default=1, const=1,
+                             help='Number of processes to search with')
+    srcf_parser.add_argument('-resume', action='store_true',
+                             help='Continue an interrupted search, from the search log in out_dir')
+    srcf_parser.add_argument('-overwrite_log', action='store_true',
+                             help='Start over even if out_dir has a search log of this search')
 
     # Dual-purpose arguments:
     srcf_parser.add_argument('-lhs', type=str, nargs='?', default=None, const=None,
@@ -82,16 +90,27 @@ def enumerate_over_signed_rcf_main(args):
                 print("File under given name already exists. Choose different name for output file.")
                 return
             else:
-                print('Saving the pickled enumeration to ' + str(args.out_dir))
+                print('Saving the enumeration to ' + str(args.out_dir))
         lhs = get_lhs_generator(args.lhs, args)
         return lhs
     if args.mode == 'search':
         print('Running a search for conjectures using ESMA algorithm:')
-        if args.lhs is not None:
+        lhs_coefs = None
+        lhs_source = None  # identifies the searched LHS in the search log
+        if args.lhs is not None and is_lhs_file(args.lhs):
+            header = read_lhs_header(args.lhs)
+            lhs_range = args.lhs_range if args.lhs_range is not None else [0, header.count]
+            lhs_coefs = LHSFileSlice(args.lhs, *lhs_range)  # read while searching
+            lhs_source = (os.path.abspath(args.lhs), tuple(lhs_range))
+            custom_lhs = None
+            print("Searching {} of {} LHS variations of the existing LHS enumeration".format(len(lhs_coefs),
+                                                                                            header.count))
+        elif args.lhs is not None:  # pickled generic enumeration
             with open(args.lhs, 'rb') as f:
                 print("Starting to load existing LHS enumeration:")
                 strt = time()
                 custom_lhs = pickle.load(f)
+                lhs_source = (os.path.abspath(args.lhs), None)
                 print("Loaded {} LHS variations. Took {} sec".format(len(custom_lhs), time() - strt))
         else:
             custom_lhs = None
@@ -103,13 +122,18 @@ def enumerate_over_signed_rcf_main(args):
             raise ValueError
         results, _ = esma_search_wrapper(constant=g_const_dict[args.constant],
                                          custom_enum=custom_lhs,
+                                         lhs_coefs=lhs_coefs,
                                          poly_deg=args.poly_deg,
                                          coeff_lim=args.coeff_lim,
                                          cycle_range=args.cycle_range,
                                          min_deg=args.min_deg,
                                          depth=args.depth,
                                          out_dir=args.out_dir,
-                                         do_print=(not args.no_print))
+                                         do_print=(not args.no_print),
+                                         num_processes=args.num_processes,
+                                         resume=args.resume,
+                                         overwrite_log=args.overwrite_log,
+                                         lhs_source=lhs_source)
         return results
 
 
@@ -7,81 +7,119 @@
 
 
 """
-next step:
-    make it fast. how?
-        - convert it to Class, keep table of inverts
-        - avoid unnecessary allocations. keep max poly degree?
-        - vectorize?
-        - faster modulo?
-TODO - unittests
+Berlekamp-Massey over a prime field, on preallocated int64 buffers.
+A BerlekampMassey object runs on a batch of sequences at once (one row per sequence), and consumes one term of every
+sequence per call to feed(). All values are kept reduced modulo p (p < 2 ** 31), so products fit in int64.
 """
 
-from numpy import array, int64, concatenate
+import numpy as np
+from functools import lru_cache
 
+# inverses are looked up in a table for primes up to this size, and calculated with pow for larger primes
+MAX_INVERSE_TABLE_PRIME = 2 ** 20
 
-def _inv_mod(a, p):  # get inverted modulo of prime-field p.
-    b = p
-    caa, cba = 1, 0
-    while b != 0:
-        caa, cba = cba, caa - (a // b) * cba
-        a, b = b, a % b
-    return caa
 
+@lru_cache(maxsize=16)
+def _inverse_table(p):
+    return np.array([0] + [pow(x, -1, p) for x in range(1, p)], dtype=np.int64)
 
-def _poly_add(a_x, b_x):  # add 2 polynomials
-    if len(a_x) > len(b_x):
-        b_x = concatenate((b_x, [0] * (len(a_x) - len(b_x))))
-    elif len(a_x) < len(b_x):
-        a_x = concatenate((a_x, [0] * (len(b_x) - len(a_x))))
-    return a_x + b_x
 
+class BerlekampMassey(object):
+    def __init__(self, p, max_len, batch_size=1):
+        """
+        :param p: prime number field
+        :param max_len: maximal number of terms in each sequence
+        :param batch_size: number of sequences to run together
+        """
+        assert p < 2 ** 31
+        self.p = p
+        self.max_len = max_len
+        self.batch_size = batch_size
+        if p <= MAX_INVERSE_TABLE_PRIME:
+            self.inverses = _inverse_table(p)
+        else:
+            self.inverses = None
+        self.s_ = np.zeros((batch_size, max_len), dtype=np.int64)  # input series (reduced modulo p)
+        self.c_ = np.zeros((batch_size, max_len + 3), dtype=np.int64)  # current polynomial
+        self.shifted_b_ = np.zeros((batch_size, max_len + 3), dtype=np.int64)  # x^m * previous error polynomial
+        self.lengths = np.zeros(batch_size, dtype=np.int64)  # current LFSR length (L)
+        self.b = np.ones(batch_size, dtype=np.int64)  # copy of the last discrepancy d
+        self.n = 0  # number of terms consumed
+        self.c_[:, 0] = 1
+        self.shifted_b_[:, 1] = 1
+
+    def _invert(self, values):
+        if self.inverses is not None:
+            return self.inverses[values]
+        return np.array([pow(int(x), -1, self.p) for x in values], dtype=np.int64)
+
+    def feed(self, terms):
+        """
+        consume the next term of every sequence in the batch.
+        :param terms: one integer per sequence (any size, will be reduced modulo p)
+        :return: the discrepancies (0 where the current LFSR already predicted the term)
+        """
+        n, p = self.n, self.p
+        assert n < self.max_len, 'sequence is longer than max_len'
+        width = n + 2  # degrees of all polynomials are at most n + 1 at this step
+        c_, shifted_b_ = self.c_[:, :width], self.shifted_b_[:, :width + 1]
+        self.s_[:, n] = [int(t) % p for t in terms]
+        d = ((c_[:, :n + 1] * self.s_[:, n::-1]) % p).sum(axis=1) % p
+        if d.any():
+            change = (d != 0) & (2 * self.lengths <= n)
+            prev_c_ = c_[change]
+            q = (d * self._invert(self.b)) % p  # q = 0 where d = 0, and these rows stay as they are
+            c_ -= q[:, None] * shifted_b_[:, :width]
+            c_ %= p
+            shifted_b_[:, 1:] = shifted_b_[:, :-1]
+            shifted_b_[change, 1:] = prev_c_
+            self.lengths[change] = n + 1 - self.lengths[change]
+            self.b[change] = d[change]
+        else:
+            shifted_b_[:, 1:] = shifted_b_[:, :-1]
+        self.n += 1
+        return d
 
-def _update_polynomial(c_x, b_x, d, b, m, p):  # update step of massey algorithm
-    b_x = concatenate(([0] * m, b_x))
-    q = (d * _inv_mod(b, p)) % p
-    b_x = (-b_x * q) % p
-    c_x = _poly_add(c_x, b_x) % p
-    return c_x
+    def lfsr(self, i=0):
+        """
+        :param i: index of sequence in the batch
+        :return: coefficients of the LFSR polynomial of sequence i (of length L+1), in symmetric range around 0.
+        """
+        c_ = self.c_[i, :self.lengths[i] + 1]
+        return np.array([int(x) for x in (c_ + (self.p // 2)) % self.p - (self.p // 2)], dtype=object)
 
 
-def slow_massey(line, p):
+def massey(line, p):
     """
     Apply "Berlekamp-Massey" Algorithm on series.
     :param line: input series
     :param p: prime number field
     :return: polynomial coefficients of P field.
     """
-    assert p < 2 ** 32
-    s_ = array(line, dtype=object)  # input series
-    c_ = array([1], dtype=object)  # current polynomial
-    b_ = array([1], dtype=object)  # previous error polynomial
-    poly_deg = 0  # current polynomial degree
-    m = 1  # number of iterations since last error
-    b = 1  # copy of the last discrepancy d
-
-    for n in range(0, len(line)):
-        d = s_[n]
-        for i in range(1, poly_deg + 1):
-            d += (c_[i] * s_[n - i]) % p
-            d %= p
-        if d == 0:
-            m += 1
-        elif (2 * poly_deg) <= n:
-            temp_copy = c_.copy()
-            c_ = _update_polynomial(c_, b_, d, b, m, p)
-            poly_deg = n + 1 - poly_deg
-            b_ = temp_copy.copy()
-            b = d
-            m = 1
-        else:
-            c_ = _update_polynomial(c_, b_, d, b, m, p)
-            m = m + 1
-    try:
-        first_non_zero = [x for x in c_ if x != 0][0]
-        c_ = (c_ * _inv_mod(first_non_zero, p) + (p // 2)) % p - (p // 2)
-    except RuntimeError:  # Exception will only happen if c_ is all zeros, which is bad anyway
-        print('Something went wrong with slow_massey algorithm')
-    return c_
+    return batch_massey([line], p)[0]
+
+
+def batch_massey(lines, p):
+    """
+    Apply "Berlekamp-Massey" Algorithm on many series at once (series of the same length are calculated together).
+    :param lines: input series
+    :param p: prime number field
+    :return: list of polynomial coefficients of P field, one for each series.
+    """
+    results = [None] * len(lines)
+    lengths = {}
+    for i, line in enumerate(lines):
+        lengths.setdefault(len(line), []).append(i)
+    for length, indices in lengths.items():
+        engine = BerlekampMassey(p, length, len(indices))
+        for n in range(length):
+            engine.feed([lines[i][n] for i in indices])
+        for j, i in enumerate(indices):
+            results[i] = engine.lfsr(j)
+    return results
+
+
+slow_massey = massey  # name of the previous, pure python implementation
 
 
 def massey_check(a_, p=199):
@@ -90,7 +128,7 @@ def massey_check(a_, p=199):
     :param p: prime base
     :param a_: series
     """
-    shift_reg = slow_massey(a_, p)
+    shift_reg = massey(a_, p)
     print("\tmassey shift register: {}\n\twith length: {}".format(shift_reg, len(shift_reg)))
-    if len(shift_reg < len(a_)//20):
+    if len(shift_reg) < len(a_)//20:
         print('found something interesting!')
@@ -0,0 +1,94 @@
+"""
+Append-only log of an ESMA search, so a search that crashed can be resumed.
+The log is a sequence of pickled records:
+    ('header', header) - search parameters. A search can only be resumed with the same parameters.
+    ('progress', lhs_done, results) - number of LHS searched so far (in enumeration order), and the results found since
+                                      the previous progress record.
+Records are buffered and written every flush_interval seconds, so the size and write cost of the log depend on the
+number of results and the duration of the search, not on the size of the domain.
+"""
+import os
+import pickle
+from time import time
+
+DEFAULT_FLUSH_INTERVAL = 60  # seconds
+
+
+class ResultLog(object):
+    def __init__(self, path, header, resume=False, overwrite=False, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        Opens a log for writing. If resume is set and the log exists, its progress and results are loaded.
+        Otherwise, a new log is started. An existing log is only overwritten if overwrite is set, so a log of a search
+        that crashed isn't lost by starting it again without resume (FileExistsError is raised instead).
+        :param path: log file path.
+        :param header: search parameters (anything that can be pickled and compared).
+        :param resume: continue an existing log.
+        :param overwrite: start a new log even if one exists.
+        :param flush_interval: seconds between writes.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lhs_done = 0
+        self.results = []
+        self._pending_results = []
+        self._pending_lhs_done = 0
+        if resume and os.path.exists(path):
+            valid_size = self._load(header)
+            self.file = open(path, 'r+b')
+            self.file.truncate(valid_size)  # drop a partially written record
+            self.file.seek(valid_size)
+        elif os.path.exists(path) and not overwrite:
+            raise FileExistsError('{} exists. resume the search, or overwrite the log'.format(path))
+        else:
+            self.file = open(path, 'wb')
+            pickle.dump(('header', header), self.file)
+            self.file.flush()
+        self._pending_lhs_done = self.lhs_done
+        self.last_flush = time()
+
+    def _load(self, header):
+        """
+        reads the log. raises ValueError if it was written by a search with different parameters.
+        :return: size of the valid part of the log.
+        """
+        with open(self.path, 'rb') as f:
+            try:
+                record = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):
+                raise ValueError('{} is not a valid search log'.format(self.path))
+            if record != ('header', header):
+                raise ValueError('{} was written by a search with different parameters'.format(self.path))
+            valid_size = f.tell()
+            while True:
+                try:
+                    _, lhs_done, results = pickle.load(f)
+                except (EOFError, pickle.UnpicklingError, ValueError):
+                    break
+                self.lhs_done = lhs_done
+                self.results += results
+                valid_size = f.tell()
+        return valid_size
+
+    def add(self, lhs_done, results):
+        """
+        records the progress of the search.
+        :param lhs_done: number of LHS searched so far.
+        :param results: new results (of the last LHS).
+        """
+        self._pending_lhs_done = lhs_done
+        self._pending_results += results
+        if time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending_lhs_done != self.lhs_done or self._pending_results:
+            pickle.dump(('progress', self._pending_lhs_done, self._pending_results), self.file)
+            self.file.flush()
+            self.lhs_done = self._pending_lhs_done
+            self.results += self._pending_results
+            self._pending_results = []
+        self.last_flush = time()
+
+    def close(self):
+        self.flush()
+        self.file.close()
@@ -3,6 +3,9 @@ import struct
 import pickle
 import mpmath
 import itertools
+import numpy as np
+from collections import OrderedDict
+from copy import copy
 from time import time
 from pybloom_live import BloomFilter
 from functools import reduce
@@ -13,6 +16,88 @@ from ramanujan.constants import g_N_initial_search_dps
 
 # precision required from table
 DEFAULT_THRESHOLD = 10**-10
+DEFAULT_BLOOM_ERROR_RATE = 0.05
+# keys are truncated, so a GCF value that is approximated up to a unit in the last digit can land next to its LHS key
+DEFAULT_KEY_TOLERANCE = 1
+# number of (key, precision) pairs whose evaluated LHS values are cached (see LHSHashTable.evaluate)
+DEFAULT_EVALUATE_CACHE_SIZE = 1024
+CONSTANTS_CACHE_SIZE = 8  # number of precisions whose constant values are cached
+LHS_FILE_HEADER = 'LHSHashTable'  # first record of LHS files that record the search range (see _save_to_file)
+FINGERPRINT_MASK = 2**32 - 1
+
+
+class LHSKeyFilter(object):
+    """
+    Two-level filter of LHS keys, used by the enumerators to find hits.
+    A bloom filter rejects most keys. Keys that pass it are checked against a sorted array of the 32-bit fingerprints
+    of all LHS keys (4 bytes per key), which rejects almost all of the bloom filter's false positives before any high
+    precision work is done on them.
+    A key is in the filter if there is an LHS key within +-tolerance of it. The bloom filter holds buckets of
+    2**bucket_bits keys (wider than the tolerance range), and every LHS key is added to the buckets of key-tolerance and
+    key+tolerance, so a lookup checks only the bucket of the key. The fingerprints are sorted, so checking the range
+    around a key is a single binary search.
+    Keys outside the range of the LHS keys (e.g. of GCFs that diverge) are rejected before both levels.
+    """
+    def __init__(self, keys, capacity, error_rate=DEFAULT_BLOOM_ERROR_RATE, tolerance=0):
+        """
+        :param keys: LHS keys.
+        :param capacity: maximal number of keys.
+        :param error_rate: false positive rate of the bloom filter.
+        :param tolerance: maximal distance between a key and an LHS key that matches it.
+        """
+        self.tolerance = tolerance
+        self.bucket_bits = (2 * tolerance).bit_length()
+        # with a tolerance, a key can be added to 2 buckets
+        self.bloom = BloomFilter(capacity=max(capacity, 1) * (2 if tolerance else 1), error_rate=error_rate)
+        self.fingerprints = np.empty(0, dtype=np.uint32)
+        # range of the keys that can be in the filter (an empty range until keys are added)
+        self.min_key, self.max_key = 1, 0
+        self.counts = {'filter_lookups': 0, 'filter_bloom_passed': 0, 'filter_fingerprint_rejected': 0}
+        self.add_keys(keys)
+
+    def add_keys(self, keys):
+        fingerprints = []
+        for key in keys:
+            key = int(key)
+            self.bloom.add(str((key - self.tolerance) >> self.bucket_bits))
+            self.bloom.add(str((key + self.tolerance) >> self.bucket_bits))
+            fingerprints.append(key & FINGERPRINT_MASK)
+            if self.min_key > self.max_key:
+                self.min_key, self.max_key = key - self.tolerance, key + self.tolerance
+            else:
+                self.min_key = min(self.min_key, key - self.tolerance)
+                self.max_key = max(self.max_key, key + self.tolerance)
+        self.fingerprints = np.union1d(self.fingerprints, np.array(fingerprints, dtype=np.uint32))
+
+    def __contains__(self, key):
+        counts = self.counts
+        counts['filter_lookups'] += 1
+        key = int(key)
+        if not self.min_key <= key <= self.max_key or str(key >> self.bucket_bits) not in self.bloom:
+            return False
+        counts['filter_bloom_passed'] += 1
+        fingerprints = self.fingerprints
+        low = (key - self.tolerance) & FINGERPRINT_MASK
+        high = (key + self.tolerance) & FINGERPRINT_MASK
+        if low <= high:
+            i = np.searchsorted(fingerprints, low)
+            if i < len(fingerprints) and fingerprints[i] <= high:
+                return True
+        elif len(fingerprints) and (fingerprints[-1] >= low or fingerprints[0] <= high):  # the range wraps around
+            return True
+        counts['filter_fingerprint_rejected'] += 1
+        return False
+
+    def stats(self):
+        """
+        :return: the counts, and the observed false positive rate of the bloom filter (keys rejected by the
+                 fingerprints out of all keys that are not hits). false positives of the fingerprints are only found
+                 when the hits are refined.
+        """
+        stats = dict(self.counts)
+        negatives = stats['filter_lookups'] - stats['filter_bloom_passed'] + stats['filter_fingerprint_rejected']
+        stats['bloom_false_positive_rate'] = stats['filter_fingerprint_rejected'] / negatives if negatives else 0.
+        return stats
 
 
 class LHSHashTable(object):
@@ -20,51 +105,110 @@ class LHSHashTable(object):
     This class makes use of bloom filters and a regular representation to improve performance 
     LHS items are stored in their "raw" form on a file called self.s_name. This file is only 
     opened when needed, to reduce memory consumptions.
-    The bloom filter is always loaded and used to determine if a LHS value is in the database
+    The key filter (bloom filter and key fingerprints, see LHSKeyFilter) is always loaded and used to determine if a LHS
+    value is in the database
     all LHS possibilities within computed domain
+    The file records the search range it covers. Loading it with a larger search range (or calling extend) enumerates
+    only the LHS values with a coefficient outside the recorded range, and merges them into the file and key filter.
     """
-    def __init__(self, name, search_range, const_vals, threshold=DEFAULT_THRESHOLD) -> None:
+    def __init__(self, name, search_range, const_vals, threshold=DEFAULT_THRESHOLD,
+                 bloom_error_rate=DEFAULT_BLOOM_ERROR_RATE, key_tolerance=DEFAULT_KEY_TOLERANCE,
+                 evaluate_cache_size=DEFAULT_EVALUATE_CACHE_SIZE) -> None:
         """
         hash table for LHS. storing values in the form of (a + b*x_1 + c*x_2 + ...)/(d + e*x_1 + f*x_2 + ...)
-        :param search_range: range for value coefficient values
+        :param search_range: range for value coefficient values. if the stored file covers a smaller range, it is
+                             extended (see extend).
         :param const_vals: constants for x.
         :param threshold: decimal threshold for comparison. in fact, the keys for hashing will be the first
                             -log_{10}(threshold) digits of the value. for example, if threshold is 1e-10 - then the
                             first 10 digits will be used as the hash key.
+        :param bloom_error_rate: false positive rate of the bloom filter. lower rates use more memory, but most false
+                                 positives are rejected by the key fingerprints anyway.
+        :param key_tolerance: keys within +-key_tolerance of an LHS key match it (in lookups and in evaluate).
+        :param evaluate_cache_size: number of (key, precision) pairs whose evaluated values are cached.
         """
         
         self.name = name
         self.s_name = self.lhs_hash_name_to_shelve_name(name)
         self.threshold = threshold
+        self.key_tolerance = key_tolerance
+        self.bloom_error_rate = bloom_error_rate
         key_factor = 1 / threshold
         self.max_key_length = len(str(int(key_factor))) * 2
+        self.sym_constants = const_vals
         self.constant_generator = create_mpf_const_generator(const_vals)
+        self.evaluate_cache_size = evaluate_cache_size
+        self._clear_caches()
         const_vals = [const() for const in self.constant_generator]
-        constants = [mpmath.mpf(1)] + const_vals
-        self.n_constants = len(constants)
+        self.key_constants = [mpmath.mpf(1)] + const_vals  # constant values used to create the keys
+        self.n_constants = len(self.key_constants)
         
-        self.max_capacity = (search_range * 2 + 1) ** (self.n_constants * 2)
         self.pack_format = 'll' * self.n_constants
         self.lhs_possibilities = {}
-        self.bloom = BloomFilter(capacity=self.max_capacity, error_rate=0.05)
         
         start_time = time()
 
         if os.path.isfile(self.s_name):
             print(f'loading from {self.s_name}')
-            self._load_from_file(self.s_name)
+            stored_range = self._load_from_file(self.s_name)
+            # files that don't record their range cover the range of their stored coefficients. the requested range
+            # can't be assumed, since all the ranges of a constant share the same file
+            self.search_range = self._stored_range() if stored_range is None else stored_range
         else:
             print('no existing db found, generating dict')
-            with mpmath.workdps(g_N_initial_search_dps):
-                self._enumerate_lhs_domain(constants, search_range, key_factor)
+            self.search_range = 0  # an empty table
+        self._extend_lhs_possibilities(search_range)
 
-        with open(self.s_name, 'wb') as f:
-            pickle.dump(self.lhs_possibilities, f)
+        self._save_to_file()
+        self.max_capacity = (self.search_range * 2 + 1) ** (self.n_constants * 2)
+        self.key_filter = LHSKeyFilter(self.lhs_possibilities.keys(), self.max_capacity, bloom_error_rate,
+                                       key_tolerance)
 
         # after init, deleteing self.lhs_possibilities to free unused memory 
         self.lhs_possibilities = None
         print('initializing LHS dict: {}'.format(time() - start_time))
 
+    def extend(self, search_range):
+        """
+        extend the table to a larger search range. only LHS values with a coefficient outside the current range are
+        enumerated, and they are merged into the stored file and the key filter.
+        :param search_range: new range for coefficient values.
+        """
+        if search_range <= self.search_range:
+            return
+        start_time = time()
+        if self.lhs_possibilities is None:
+            self._load_from_file(self.s_name)
+        new_keys = self._extend_lhs_possibilities(search_range)
+        self._save_to_file()
+
+        self.max_capacity = (self.search_range * 2 + 1) ** (self.n_constants * 2)
+        bloom = self.key_filter.bloom
+        if bloom.count + 2 * len(new_keys) <= bloom.capacity:
+            self.key_filter.add_keys(new_keys)
+        else:  # the bloom filter is full, create a larger one
+            self.key_filter = LHSKeyFilter(self.lhs_possibilities.keys(), self.max_capacity, self.bloom_error_rate,
+                                           self.key_tolerance)
+
+        self.lhs_possibilities = None
+        self._clear_caches()  # new keys may be neighbours of evaluated keys
+        print('extending LHS dict: {}'.format(time() - start_time))
+
+    def _extend_lhs_possibilities(self, search_range):
+        """
+        enumerate the LHS values that are in search_range but not in self.search_range into self.lhs_possibilities.
+        :return: the new keys.
+        """
+        if search_range <= self.search_range:
+            return []
+        if self.search_range:
+            print(f'extending search range from {self.search_range} to {search_range}')
+        with mpmath.workdps(g_N_initial_search_dps):
+            new_keys = self._enumerate_lhs_domain(self.key_constants, search_range, 1 / self.threshold,
+                                                  self.search_range)
+        self.search_range = search_range
+        return new_keys
+
     @staticmethod
     def _create_rational_numbers_blacklist(search_range, key_factor):
         # LHS numerator and denominator might cancel out and LHS will be rational. 
@@ -76,14 +220,43 @@ class LHSHashTable(object):
         # +-1 for numeric errors in keys.
         return set(rational_keys + [x + 1 for x in rational_keys] + [x - 1 for x in rational_keys])
 
-    def _load_from_file(self, db_path):
+    @staticmethod
+    def _read_file(db_path):
+        """
+        :return: the search range recorded in the file (None for files that don't record it), and the LHS dict.
+        """
         with open(db_path, 'rb') as f:
-            self.lhs_possibilities = pickle.load(f)
-        for key in self.lhs_possibilities.keys():
-            self.bloom.add(key)
+            record = pickle.load(f)
+            if isinstance(record, dict):
+                return None, record
+            _, search_range = record
+            return search_range, pickle.load(f)
+
+    def _load_from_file(self, db_path):
+        search_range, self.lhs_possibilities = self._read_file(db_path)
+        return search_range
+
+    def _stored_range(self):
+        """
+        :return: the largest absolute coefficient value in self.lhs_possibilities.
+        """
+        return max((max(map(abs, struct.unpack(self.pack_format, lhs_match)))
+                    for matches in self.lhs_possibilities.values() for lhs_match in matches), default=0)
 
-    def _enumerate_lhs_domain(self, constants, search_range, key_factor):
+    def _save_to_file(self):
+        with open(self.s_name, 'wb') as f:
+            pickle.dump((LHS_FILE_HEADER, self.search_range), f)
+            pickle.dump(self.lhs_possibilities, f)
+
+    def _enumerate_lhs_domain(self, constants, search_range, key_factor, previous_range=0):
+        """
+        :param previous_range: range that was already enumerated. only coefficients outside of it are enumerated.
+        :return: the new keys.
+        """
         rational_blacklist = LHSHashTable._create_rational_numbers_blacklist(search_range, key_factor)
+        # stored values that are rational numbers of the new range
+        for key in rational_blacklist:
+            self.lhs_possibilities.pop(str(key), None)
 
         # Create enumeration lists
         coefs_top = [range(-search_range, search_range + 1)] * self.n_constants  # numerator range
@@ -91,6 +264,11 @@ class LHSHashTable(object):
         coef_top_list = itertools.product(*coefs_top)
         coef_bottom_list = list(itertools.product(*coefs_bottom))
         denominator_list = [sum(i * j for (i, j) in zip(c_bottom, constants)) for c_bottom in coef_bottom_list]
+        all_bottoms = list(zip(coef_bottom_list, denominator_list))
+        # denominators with a coefficient outside of previous_range
+        new_bottoms = [(c_bottom, denominator) for c_bottom, denominator in all_bottoms
+                       if max(map(abs, c_bottom)) > previous_range]
+        new_keys = []
 
         # start enumerating
         for c_top in coef_top_list:
@@ -99,7 +277,7 @@ class LHSHashTable(object):
                 continue
             numerator = mpmath.mpf(numerator)
 
-            for c_bottom, denominator in zip(coef_bottom_list, denominator_list):
+            for c_bottom, denominator in (all_bottoms if max(map(abs, c_top)) > previous_range else new_bottoms):
                 if reduce(gcd, c_top + c_bottom) != 1:  # avoid expressions that can be simplified easily
                     continue
                 if denominator == 0:  # don't store inf or nan.
@@ -113,7 +291,8 @@ class LHSHashTable(object):
                 
                 str_key = str(key)
                 self._add_to_lhs_possibilities(str_key, c_top, c_bottom)
-                self.bloom.add(str_key)
+                new_keys.append(str_key)
+        return new_keys
     
     def __contains__(self, item):
         """
@@ -121,7 +300,7 @@ class LHSHashTable(object):
         :param item: key
         :return: true of false
         """
-        return item in self.bloom
+        return item in self.key_filter
 
     def __getitem__(self, item):
         """
@@ -131,6 +310,35 @@ class LHSHashTable(object):
         """
         return self._get_by_key(item)
 
+    def _clear_caches(self):
+        self._constants_cache = OrderedDict()  # mpmath precision -> constant values
+        self._evaluate_cache = OrderedDict()  # (key, mpmath precision) -> evaluated values
+
+    def __getstate__(self):
+        # the mpf generators of the constants (and mpmath constants such as mpmath.e in key_constants) can't be
+        # pickled. they are created again from the sympy constants.
+        state = self.__dict__.copy()
+        state['constant_generator'] = state['key_constants'] = None
+        state['_constants_cache'] = state['_evaluate_cache'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.constant_generator = create_mpf_const_generator(self.sym_constants)
+        self.key_constants = [mpmath.mpf(1)] + [const() for const in self.constant_generator]
+        self._clear_caches()
+
+    def read_only_copy(self):
+        """
+        copy for evaluating keys in other processes (e.g. when refining results). the copy has no key filter, and only
+        reads the LHS dict from self.s_name when it's needed.
+        """
+        lhs = copy(self)
+        lhs.key_filter = None
+        lhs.lhs_possibilities = None
+        lhs._clear_caches()
+        return lhs
+
     def __eq__(self, other):
         """
         operator ==
@@ -163,14 +371,22 @@ class LHSHashTable(object):
         return ret
 
     def _get_by_key(self, key):
-        with open(self.s_name, 'rb') as f:
-            if self.lhs_possibilities is None:
-                self.lhs_possibilities = pickle.load(f)
-            values = []
-            for lhs_match in self.lhs_possibilities[str(key)]:
-                vals = struct.unpack(self.pack_format, lhs_match)
-                values.append([vals[:self.n_constants], vals[-self.n_constants:]])
-            return values
+        """
+        :return: the stored values of all LHS keys within +-self.key_tolerance of key, in order of the keys.
+        """
+        if self.lhs_possibilities is None:
+            self._load_from_file(self.s_name)
+        key = int(key)
+        matches = []
+        for neighbour in range(key - self.key_tolerance, key + self.key_tolerance + 1):
+            matches += self.lhs_possibilities.get(str(neighbour), [])
+        if not matches:
+            raise KeyError(key)
+        values = []
+        for lhs_match in matches:
+            vals = struct.unpack(self.pack_format, lhs_match)
+            values.append([vals[:self.n_constants], vals[-self.n_constants:]])
+        return values
 
     @classmethod
     def load_from(cls, name):
@@ -191,10 +407,31 @@ class LHSHashTable(object):
         else:
             self.lhs_possibilities[str_key] = [struct.pack(self.pack_format, *[*c_top, *c_bottom])]
 
-    def evaluate(self, key):
+    def _get_constant_values(self):
         # this function will usually be called under a different mpf workdps
-        # generating constant_values again here to match scope's precision
+        # generating constant_values again for each precision to match scope's precision
+        prec = mpmath.mp.prec
+        if prec in self._constants_cache:
+            self._constants_cache.move_to_end(prec)
+            return self._constants_cache[prec]
         const_vals = [const() for const in self.constant_generator]
+        self._constants_cache[prec] = const_vals
+        if len(self._constants_cache) > CONSTANTS_CACHE_SIZE:
+            self._constants_cache.popitem(last=False)
+        return const_vals
+
+    def evaluate(self, key):
+        """
+        evaluate the LHS values of key at the scope's precision. the values of the last self.evaluate_cache_size
+        (key, precision) pairs are cached.
+        :return: list of (value, c_top, c_bottom)
+        """
+        cache_key = (int(key), mpmath.mp.prec)
+        if cache_key in self._evaluate_cache:
+            self._evaluate_cache.move_to_end(cache_key)
+            return list(self._evaluate_cache[cache_key])
+
+        const_vals = self._get_constant_values()
         stored_values = self._get_by_key(key)
         evaluated_values = []
         for c_top, c_bottom in stored_values:
@@ -202,7 +439,11 @@ class LHSHashTable(object):
             denominator = self.prod(c_bottom, const_vals)
             evaluated_values.append((mpmath.mpf(numerator) / mpmath.mpf(denominator), c_top, c_bottom))
 
-        return evaluated_values
+        if self.evaluate_cache_size:
+            self._evaluate_cache[cache_key] = evaluated_values
+            if len(self._evaluate_cache) > self.evaluate_cache_size:
+                self._evaluate_cache.popitem(last=False)
+        return list(evaluated_values)
 
     def evaluate_sym(self, key, symbols):
         stored_values = self._get_by_key(key)
@@ -0,0 +1,282 @@
+"""
+Shared LHS lookup service. One process loads an LHSHashTable and serves it over a Unix socket, so several searches for
+the same constant on one host don't each load the LHS dict into their own memory.
+
+Running the service (in its own process):
+    lhs = LHSHashTable('zeta3.lhs.dept20.db', 20, [g_const_dict['zeta'](3)])
+    LHSServer(lhs, '/tmp/zeta3_lhs.sock').serve_forever()
+
+Using it from an enumerator, in place of the LHSHashTable:
+    lhs = LHSClient('/tmp/zeta3_lhs.sock')
+    enumerator = EfficientGCFEnumerator(lhs, poly_search_domain, [g_const_dict['zeta'](3)])
+
+The client copies the key filter of the table once (see LHSKeyFilter, a few MB), so 'key in lhs' is answered locally.
+Evaluations go through the socket, at the client's mpmath precision. contains and evaluate_many send a batch of keys in
+one request.
+Connections are authenticated with a key, by default a random key that the server writes to '<address>.key' (readable
+only by its user), so other users can't send requests to the server.
+LocalLHSClient has the same interface over an LHSHashTable in the same process, and connect_lhs falls back to it when
+no service is running (e.g. in tests).
+"""
+import os
+import socket
+import stat
+import threading
+from copy import copy
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+import mpmath
+
+from ramanujan.LHSHashTable import LHSHashTable
+
+
+AUTHKEY_LENGTH = 32
+
+
+def key_path(address):
+    """
+    :return: path of the file of the key that authenticates the connections to the server at address.
+    """
+    return address + '.key'
+
+
+def _read_authkey(address):
+    with open(key_path(address), 'rb') as f:
+        return f.read()
+
+
+def _write_authkey(address):
+    path = key_path(address)
+    if os.path.exists(path):
+        os.remove(path)
+    authkey = os.urandom(AUTHKEY_LENGTH)
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+        f.write(authkey)
+    return authkey
+
+
+def _remove_stale_socket(address):
+    """
+    remove the socket at address, if it was left by a server that is not running.
+    """
+    if not os.path.exists(address):
+        return
+    if not stat.S_ISSOCK(os.stat(address).st_mode):
+        raise FileExistsError('{} exists and is not a socket'.format(address))
+    with socket.socket(socket.AF_UNIX) as sock:
+        try:
+            sock.connect(address)
+        except ConnectionRefusedError:
+            os.remove(address)
+            return
+    raise FileExistsError('an LHS server is already running at {}'.format(address))
+
+
+def _evaluate_many(lhs, keys):
+    """
+    :return: dict of key -> lhs.evaluate(key), for the keys that are in the table.
+    """
+    values = {}
+    for key in keys:
+        try:
+            values[key] = lhs.evaluate(key)
+        except (KeyError, ZeroDivisionError):
+            pass
+    return values
+
+
+class LHSServer(object):
+    def __init__(self, lhs, address, authkey=None):
+        """
+        :param lhs: LHSHashTable to serve.
+        :param address: path of the Unix socket. a socket that was left in this path by a server that is not running
+                        is removed. if a server is running, FileExistsError is raised.
+        :param authkey: key that the clients authenticate with. if None, a random key is written to key_path(address).
+        """
+        self.lhs = lhs
+        self.address = address
+        # mpmath's precision is global, so requests are handled one at a time
+        self.lock = threading.Lock()
+        self.closed = False
+        _remove_stale_socket(address)
+        self.write_authkey = authkey is None
+        self.authkey = _write_authkey(address) if self.write_authkey else authkey
+        self.listener = Listener(address, family='AF_UNIX', authkey=self.authkey)
+
+    def serve_forever(self):
+        """
+        accept clients until close is called. every client is served by its own thread.
+        """
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):  # a client without the key, or that disconnected
+                continue
+            except OSError:
+                break
+            if self.closed:
+                connection.close()
+                break
+            threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def start(self):
+        """
+        serve in a background thread.
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        self.closed = True
+        with socket.socket(socket.AF_UNIX) as sock:  # wake up accept
+            sock.connect(self.address)
+        self.listener.close()
+        if self.write_authkey and os.path.exists(key_path(self.address)):
+            os.remove(key_path(self.address))
+
+    def _serve_connection(self, connection):
+        with connection:
+            while True:
+                try:
+                    command, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    with self.lock:
+                        response = ('ok', self._handle(command, *args))
+                except Exception as e:
+                    response = ('error', e)
+                connection.send(response)
+
+    def _handle(self, command, *args):
+        if command == 'key_filter':
+            return self.lhs.key_filter
+        if command == 'contains':
+            keys, = args
+            return [key in self.lhs for key in keys]
+        if command == 'evaluate':
+            keys, prec = args
+            with mpmath.workprec(prec):
+                return _evaluate_many(self.lhs, keys)
+        if command == 'get':
+            key, = args
+            return self.lhs[key]
+        raise ValueError('unknown command {}'.format(command))
+
+
+class LHSClient(object):
+    """
+    Client of an LHSServer, with the interface of LHSHashTable that the enumerators use.
+    """
+    def __init__(self, address, authkey=None):
+        """
+        :param address: path of the server's Unix socket.
+        :param authkey: the server's key. if None, it is read from key_path(address).
+        """
+        self.address = address
+        self.authkey = _read_authkey(address) if authkey is None else authkey
+        self._connection = None
+        self.key_filter = self._request('key_filter')
+
+    def _request(self, command, *args):
+        if self._connection is None:
+            self._connection = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        self._connection.send((command, args))
+        status, value = self._connection.recv()
+        if status == 'error':
+            raise value
+        return value
+
+    def __contains__(self, key):
+        return key in self.key_filter
+
+    def __getstate__(self):
+        # connections can't be passed to other processes, copies connect again when they are used
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
+
+    def contains(self, keys):
+        """
+        :return: list of booleans, whether each of the keys is in the table.
+        """
+        return self._request('contains', list(keys))
+
+    def evaluate_many(self, keys):
+        """
+        evaluate keys at the scope's precision.
+        :return: dict of key -> evaluated values (see LHSHashTable.evaluate), for the keys that are in the table.
+        """
+        return self._request('evaluate', list(keys), mpmath.mp.prec)
+
+    def evaluate(self, key):
+        values = self.evaluate_many([key])
+        if key not in values:
+            raise KeyError(key)
+        return values[key]
+
+    def evaluate_sym(self, key, symbols):
+        return [LHSHashTable.prod(c_top, symbols) / LHSHashTable.prod(c_bottom, symbols)
+                for c_top, c_bottom in self._request('get', key)]
+
+    def read_only_copy(self):
+        """
+        copy for evaluating keys in other processes, without the key filter.
+        """
+        client = copy(self)
+        client._connection = None
+        client.key_filter = None
+        return client
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class LocalLHSClient(object):
+    """
+    LHSClient interface over an LHSHashTable in this process.
+    """
+    def __init__(self, lhs):
+        self.lhs = lhs
+        self.key_filter = lhs.key_filter
+
+    def __contains__(self, key):
+        return key in self.key_filter
+
+    def contains(self, keys):
+        return [key in self.lhs for key in keys]
+
+    def evaluate_many(self, keys):
+        return _evaluate_many(self.lhs, keys)
+
+    def evaluate(self, key):
+        return self.lhs.evaluate(key)
+
+    def evaluate_sym(self, key, symbols):
+        return self.lhs.evaluate_sym(key, symbols)
+
+    def read_only_copy(self):
+        return LocalLHSClient(self.lhs.read_only_copy())
+
+    def close(self):
+        pass
+
+
+def connect_lhs(address, create_lhs, authkey=None):
+    """
+    connect to the LHS service at address, or load the LHS in this process if no service is running.
+    :param address: path of the server's Unix socket.
+    :param create_lhs: function that creates the LHSHashTable (e.g. lambda: LHSHashTable(name, search_range, constants))
+    :param authkey: the server's key (see LHSClient).
+    :return: LHSClient or LocalLHSClient
+    """
+    if address and os.path.exists(address):
+        try:
+            return LHSClient(address, authkey)
+        except (ConnectionRefusedError, FileNotFoundError):  # a socket that was left by a server that is not running
+            pass
+    return LocalLHSClient(create_lhs())
@@ -1,28 +1,5 @@
-import sympy
-from sympy.core.compatibility import with_metaclass
-from sympy.core.singleton import Singleton
-from sympy.core import NumberSymbol
 import mpmath
 
-
-class Khinchin(with_metaclass(Singleton, NumberSymbol)):
-    is_real = True
-    is_positive = True
-    is_negative = False
-    is_irrational = None
-    is_number = True
-
-    mpf_val = mpmath.khinchin   # Hackish trick, used in EnumerationOverGCF.__init__
-
-    def __str__(self):
-        return 'K'
-
-    def _latex(self, printer):
-        return r"\Kai"
-
-
-sympy.S.register(Khinchin)
-
 g_N_verify_terms = 1000  # number of CF terms to calculate in __refine_results. (verify hits)
 g_N_verify_compare_length = 100  # number of digits to compare in __refine_results. (verify hits)
 g_N_verify_dps = 2000  # working decimal precision in __refine_results. (verify hits)
@@ -30,17 +7,55 @@ g_N_initial_search_terms = 32  # number of CF terms to calculate in __first_enum
 g_N_initial_key_length = 10  # number of digits to compare in __first_enumeration (initial search)
 g_N_initial_search_dps = 50  # working decimal precision in __refine_results. (verify hits)
 
-# math constants:
-g_const_dict = {
-    'zeta': sympy.zeta,
-    'e': sympy.E,
-    'pi': sympy.pi,
-    'pi_sqared': sympy.pi ** 2,
-    'catalan': sympy.Catalan,
-    'golden_ratio': sympy.GoldenRatio,
-    'khinchin': sympy.S.Khinchin,
-    'euler-mascheroni': sympy.EulerGamma,
-    'pi-acosh_2': sympy.pi * sympy.acosh(2),
-    'polygamma': sympy.polygamma
-
-}
+# sympy takes a while to import, and the enumerators only need the numeric constants above.
+# Khinchin and g_const_dict are created the first time they are accessed (see __getattr__).
+_sympy_constants = {}
+
+
+def _create_sympy_constants():
+    import sympy
+    from sympy.core.compatibility import with_metaclass
+    from sympy.core.singleton import Singleton
+    from sympy.core import NumberSymbol
+
+    class Khinchin(with_metaclass(Singleton, NumberSymbol)):
+        is_real = True
+        is_positive = True
+        is_negative = False
+        is_irrational = None
+        is_number = True
+
+        mpf_val = mpmath.khinchin   # Hackish trick, used in EnumerationOverGCF.__init__
+
+        def __str__(self):
+            return 'K'
+
+        def _latex(self, printer):
+            return r"\Kai"
+
+    Khinchin.__qualname__ = 'Khinchin'  # pickle finds it as ramanujan.constants.Khinchin (see __getattr__)
+    sympy.S.register(Khinchin)
+
+    # math constants:
+    g_const_dict = {
+        'zeta': sympy.zeta,
+        'e': sympy.E,
+        'pi': sympy.pi,
+        'pi_sqared': sympy.pi ** 2,
+        'catalan': sympy.Catalan,
+        'golden_ratio': sympy.GoldenRatio,
+        'khinchin': sympy.S.Khinchin,
+        'euler-mascheroni': sympy.EulerGamma,
+        'pi-acosh_2': sympy.pi * sympy.acosh(2),
+        'polygamma': sympy.polygamma
+
+    }
+    return {'Khinchin': Khinchin, 'g_const_dict': g_const_dict}
+
+
+def __getattr__(name):
+    if name not in ('Khinchin', 'g_const_dict'):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if not _sympy_constants:
+        _sympy_constants.update(_create_sympy_constants())
+    return _sympy_constants[name]
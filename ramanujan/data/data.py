@@ -3,8 +3,17 @@ from sympy import pi as pi
 from sympy import E as e
 from sympy import zeta
 import sympy
+from ramanujan.utils.utils import create_linear_recurrence_series
+
+
+class MasseySeries(namedtuple('MasseySeries', 'shift_reg initials')):
+    __slots__ = ()
+
+    def series(self, n):
+        """ first n terms of the series (see create_linear_recurrence_series) """
+        return create_linear_recurrence_series(self.shift_reg, self.initials, n)
+
 
-MasseySeries = namedtuple('MasseySeries', 'shift_reg initials')
 CFData = namedtuple('CFData', 'lhs rhs_an rhs_bn')
 
 pi_cf = {
@@ -2,15 +2,18 @@ from time import time
 from typing import List
 from collections import namedtuple
 from collections.abc import Iterable
-from sympy import lambdify
 from abc import ABCMeta, abstractmethod
+from itertools import zip_longest
+from functools import reduce
+from math import gcd
 
-import sympy
 import mpmath
 from ramanujan.utils.mobius import GeneralizedContinuedFraction
+from ramanujan.LHSHashTable import LHSHashTable
 from ramanujan.utils.utils import find_polynomial_series_coefficients, create_mpf_const_generator, \
     get_series_items_from_iter
-from ramanujan.utils.convergence_rate import calculate_convergence
+from ramanujan.utils.convergence_rate import calculate_convergence_rates
+from ramanujan.utils.metrics import Metrics, add_hooks_from_env
 from ramanujan.constants import g_N_initial_key_length, g_N_initial_search_dps, g_N_verify_dps
 
 
@@ -90,6 +93,10 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
         # store lhs_hash_table
         self.hash_table = hash_table
 
+        # counters and stage timers (see ramanujan/utils/metrics.py)
+        self.metrics = Metrics({'enumerator': type(self).__name__})
+        add_hooks_from_env(self.metrics)
+
     def __get_formatted_results(self, results: List[RefinedMatch]) -> List[FormattedResult]:
         ret = []
         for r in results:
@@ -97,11 +104,15 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
             bn = self.create_bn_series(r.rhs_bn_poly, 250)
             print_length = max(max(get_size_of_nested_list(r.rhs_an_poly), get_size_of_nested_list(r.rhs_bn_poly)), 5)
             gcf = GeneralizedContinuedFraction(an, bn[1:])
-            sym_lhs = self.hash_table.evaluate_sym(r.lhs_key, self.const_sym)[r.lhs_match_idx]
+            if r.lhs_key is None:  # added by expand_results
+                sym_lhs = LHSHashTable.prod(r.c_top, self.const_sym) / LHSHashTable.prod(r.c_bot, self.const_sym)
+            else:
+                sym_lhs = self.hash_table.evaluate_sym(r.lhs_key, self.const_sym)[r.lhs_match_idx]
             ret.append(FormattedResult(sym_lhs, gcf.sym_expression(print_length), gcf))
         return ret
 
     def __get_formatted_polynomials(self, result: RefinedMatch):
+        import sympy
         def sym_poly(poly_deg, poly_terms):
             poly = list(reversed(find_polynomial_series_coefficients(poly_deg, poly_terms, 0)))
             n = sympy.Symbol('n')
@@ -125,12 +136,17 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
         :param results: list of final results as received from refine_results.
         :param formatting: allowed print formats are 'unicode' and 'latex'
         """
+        import sympy  # sympy is only needed for printing, import it lazily to keep workers' startup fast
         allowed_formats = ['unicode', 'latex']
         formatted_results = self.__get_formatted_results(results)
         if formatting not in allowed_formats:
             print("unknown format, allowed formats are: {}".format(allowed_formats))
             return
-        for r, raw_r in zip(formatted_results, results):
+        if convergence_rate:
+            with mpmath.workdps(self.verify_dps):
+                rates = calculate_convergence_rates([r.GCF for r in formatted_results],
+                                                    [sympy.lambdify((), r.LHS, 'mpmath')() for r in formatted_results])
+        for i, (r, raw_r) in enumerate(zip(formatted_results, results)):
             result = sympy.Eq(r.LHS, r.RHS)
             if formatting == 'latex':
                 print(f'$$ {sympy.latex(result)} $$')
@@ -140,11 +156,10 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
                 sympy.pprint(self.__get_formatted_polynomials(raw_r))
                 print('')
             if convergence_rate:
-                with mpmath.workdps(self.verify_dps):
-                    rate = calculate_convergence(r.GCF, lambdify((), r.LHS, 'mpmath')())
-                print("Converged with a rate of {} digits per term".format(mpmath.nstr(rate, 5)))
+                print("Converged with a rate of {} digits per term".format(mpmath.nstr(rates[i], 5)))
 
     def convert_results_to_latex(self, results: List[RefinedMatch]):
+        import sympy
         results_in_latex = []
         formatted_results = self.__get_formatted_results(results)
         for r in formatted_results:
@@ -162,8 +177,15 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
             if verbose:
                 print('starting preliminary search...')
             start = time()
+            # workers get only the key filter of the LHS (see multiprocess_enumeration)
+            key_filter = getattr(self.hash_table, 'key_filter', self.hash_table)
+            filter_counts = dict(getattr(key_filter, 'counts', {}))
             # step (2)
-            intermediate_results = self._first_enumeration(verbose)
+            with self.metrics.stage('first_enumeration'):
+                intermediate_results = self._first_enumeration(verbose)
+                self.metrics.increment('bloom_hits', len(intermediate_results))
+                for name, value in filter_counts.items():
+                    self.metrics.increment(name, key_filter.counts[name] - value)
             end = time()
             if verbose:
                 print(f'that took {end - start}s')
@@ -172,7 +194,8 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
             if verbose:
                 print('calculating intermediate results to a higher precision...')
             start = time()
-            results = self._improve_results_precision(intermediate_results, verbose)
+            with self.metrics.stage('improve_precision'):
+                results = self._improve_results_precision(intermediate_results, verbose)
             end = time()
             if verbose:
                 print(f'that took {end - start}s')
@@ -194,7 +217,9 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
         with mpmath.workdps(self.verify_dps * 2):
             print('starting to verify results...')
             start = time()
-            refined_results = self._refine_results(results, True)  # step (3)
+            with self.metrics.stage('refine'):
+                refined_results = self._refine_results(results, True)  # step (3)
+                self.metrics.increment('results', len(refined_results))
             end = time()
             print(f'that took {end - start}s')
         return refined_results
@@ -204,6 +229,34 @@ class AbstractGCFEnumerator(metaclass=ABCMeta):
         # override by child
         pass
 
+    def expand_results(self, results: List[RefinedMatch]) -> List[RefinedMatch]:
+        """
+        For poly domains that prune equivalent GCFs (see CartesianProductPolyDomain), add the GCFs of the domain that
+        are equivalent to the found ones. Their values are Mobius transformations of the found values, so no further
+        evaluation is needed. The added results have no lhs_key and lhs_match_idx, their LHS is c_top / c_bot.
+        """
+        if not getattr(self.poly_domains, 'prune_equivalent_gcfs', False):
+            return results
+
+        with mpmath.workdps(self.enum_dps):
+            const_vals = [const() for const in self.constants_generator]
+        expanded_results = []
+        for res in results:
+            expanded_results.append(res)
+            for an_coefs, bn_coefs, ((p, q), (r, s)) in \
+                    self.poly_domains.expand_equivalence_class(res.rhs_an_poly, res.rhs_bn_poly)[1:]:
+                # value = c_top / c_bot, so (p*value + q) / (r*value + s) = (p*c_top + q*c_bot) / (r*c_top + s*c_bot)
+                pairs = list(zip_longest(res.c_top, res.c_bot, fillvalue=0))
+                c_top = [p * top + q * bot for top, bot in pairs]
+                c_bot = [r * top + s * bot for top, bot in pairs]
+                divisor = reduce(gcd, c_top + c_bot) or 1
+                if LHSHashTable.prod(c_top, const_vals) < 0:  # the LHS table stores positive numerators
+                    divisor = -divisor
+                expanded_results.append(RefinedMatch(None, an_coefs, bn_coefs, None,
+                                                     tuple(c // divisor for c in c_top),
+                                                     tuple(c // divisor for c in c_bot)))
+        return expanded_results
+
     def full_execution(self):
         first_iteration = self.find_initial_hits()
         refined_results = self.refine_results(first_iteration)
@@ -49,6 +49,7 @@ class EfficientGCFEnumerator(AbstractGCFEnumerator):
 
         For each an and bn pair, a gcf is calculated using efficient_gcf_calculation
         defined under this scope, and compared self.hash_tables for hits.
+        Pairs that are discarded by the poly domain's filter (e.g. pairs that don't converge) are skipped.
 
         :param verbose: if True print the status of calculation.
         :return: intermediate results (list of 'Match')
@@ -79,6 +80,8 @@ class EfficientGCFEnumerator(AbstractGCFEnumerator):
         size_b = self.get_bn_length()
         size_a = self.get_an_length()
         num_iterations = size_b * size_a
+        domain_size = num_iterations
+        pairs_evaluated = 0
         key_factor = round(1 / self.threshold)
 
         counter = 0  # number of permutations passed
@@ -99,7 +102,13 @@ class EfficientGCFEnumerator(AbstractGCFEnumerator):
                     counter += real_bn_size
                     print_counter += real_bn_size
                     continue
-                for bn_coef in zip(bn_list, b_coef_list):
+                pair_filter = self.poly_domains.filter_gcfs_block([a_coef], b_coef_list)[0]
+                n_filtered = real_bn_size - int(pair_filter.sum())
+                counter += n_filtered
+                print_counter += n_filtered
+                pairs_evaluated += real_bn_size - n_filtered
+                self.metrics.sample()
+                for bn_coef in itertools.compress(zip(bn_list, b_coef_list), pair_filter):
                     a_ = an
                     b_ = bn_coef[0]
                     key = efficient_gcf_calculation()  # calculate hash key of gcf value
@@ -132,7 +141,13 @@ class EfficientGCFEnumerator(AbstractGCFEnumerator):
                     counter += real_an_size
                     print_counter += real_an_size
                     continue
-                for an_coef in zip(an_list, a_coef_list):
+                pair_filter = self.poly_domains.filter_gcfs_block(a_coef_list, [b_coef])[:, 0]
+                n_filtered = real_an_size - int(pair_filter.sum())
+                counter += n_filtered
+                print_counter += n_filtered
+                pairs_evaluated += real_an_size - n_filtered
+                self.metrics.sample()
+                for an_coef in itertools.compress(zip(an_list, a_coef_list), pair_filter):
                     a_ = an_coef[0]
                     b_ = bn
                     key = efficient_gcf_calculation()  # calculate hash key of gcf value
@@ -151,6 +166,8 @@ class EfficientGCFEnumerator(AbstractGCFEnumerator):
                                   f'Found so far {len(results)} results. \n'
                                   f'Time left ~{time_left:.0f}s of a total of {prediction:.0f}s')
 
+        self.metrics.increment('pairs_evaluated', pairs_evaluated)
+        self.metrics.increment('pairs_filtered', domain_size - pairs_evaluated)
         if verbose:
             print(f'created results after {time() - start:.2f}s')
         return results
@@ -203,12 +220,15 @@ class EfficientGCFEnumerator(AbstractGCFEnumerator):
                             for val, _, _ in all_matches]):  # safety
                     print('Something wicked happened!')
                     print(f'Encountered a NAN or inf in LHS db, at {res.lhs_key}, {constant_vals}')
+                    self.metrics.increment('false_positives')
                     continue
             except (ZeroDivisionError, KeyError):
                 # if there was an exception here, there is no need to halt the entire execution,
                 # but only note it to the user
+                self.metrics.increment('false_positives')
                 continue
 
+            n_results = len(results)
             for i, match in enumerate(all_matches):
                 val_str = mpmath.nstr(match[0], g_N_verify_compare_length)
                 if val_str == rhs_str:
@@ -216,5 +236,7 @@ class EfficientGCFEnumerator(AbstractGCFEnumerator):
                     # LHS key, it will later be used to determine which item in the LHS dict
                     # was matched
                     results.append(RefinedMatch(*res, i, match[1], match[2]))
+            if len(results) == n_results:
+                self.metrics.increment('false_positives')
 
         return results
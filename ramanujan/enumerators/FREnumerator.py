@@ -89,7 +89,9 @@ class FREnumerator(RelativeGCFEnumerator):
         """
         results = []  # list of intermediate results        
         for an_iter, bn_iter, metadata in self._iter_domains_with_cache(FIRST_ENUMERATION_MAX_DEPTH):
+            self.metrics.sample()
             has_fr, items_calculated = check_for_fr(an_iter, bn_iter, self.poly_domains.get_an_degree(metadata.an_coef))
+            self.metrics.increment('pairs_evaluated')
             if has_fr:
                 if print_results:
                     print(f"found a GCF with FR:\n\tan: {metadata.an_coef}\n\tbn: {metadata.bn_coef}")
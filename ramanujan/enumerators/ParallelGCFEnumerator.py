@@ -30,6 +30,8 @@ def calculate_RAM_usage(shape):
 class ParallelGCFEnumerator(EfficientGCFEnumerator):
     """
     Parallel implementation of EfficientGCFEnumerator's _first_enumeration.
+    Keys of a whole chunk are calculated together, and only keys of pairs that pass the poly domain's filter, and are
+    finite and in the range of the LHS keys (e.g. not of GCFs that blew up), are looked up in the hash table.
     """
 
     def __init__(self, *args, **kwargs):
@@ -96,7 +98,11 @@ class ParallelGCFEnumerator(EfficientGCFEnumerator):
             
         start = time()
         key_factor = round(1 / self.threshold)
+        # workers get only the key filter of the LHS (see multiprocess_enumeration)
+        key_filter = getattr(self.hash_table, 'key_filter', self.hash_table)
+        min_key, max_key = getattr(key_filter, 'min_key', -np.inf), getattr(key_filter, 'max_key', np.inf)
         counter = 0  # number of permutations passed
+        pairs_evaluated = 0
         print_counter = calc_time = chunks_done = 0
         results = []  # list of intermediate results
 
@@ -111,11 +117,11 @@ class ParallelGCFEnumerator(EfficientGCFEnumerator):
         # Split task into chunks
         min_chunks = round(np.ceil(calculate_RAM_usage((asize, bsize)) / MAX_RAM))
         if min_chunks < max(asize, bsize):  # Iterate over intervals on the longer axis
-            achunk = asize if asize < bsize else np.int(np.ceil(asize / min_chunks))
-            bchunk = bsize if asize >= bsize else np.int(np.ceil(bsize / min_chunks))
+            achunk = asize if asize < bsize else int(np.ceil(asize / min_chunks))
+            bchunk = bsize if asize >= bsize else int(np.ceil(bsize / min_chunks))
         else:  # Iterate over intervals on the longer axis for each on the shorter axis
-            achunk = 1 if asize < bsize else np.int(np.ceil(asize * bsize / min_chunks))
-            bchunk = 1 if asize >= bsize else np.int(np.ceil(asize * bsize / min_chunks))
+            achunk = 1 if asize < bsize else int(np.ceil(asize * bsize / min_chunks))
+            bchunk = 1 if asize >= bsize else int(np.ceil(asize * bsize / min_chunks))
         
         if verbose:
             chunks_total = round(np.ceil(asize / achunk) * np.ceil(bsize / bchunk))
@@ -162,35 +168,24 @@ class ParallelGCFEnumerator(EfficientGCFEnumerator):
                 
                 # calculate hash key of gcf value  
                 many_keys = efficient_gcf_calculation(shape, a_.shape[0])
+                pairs_evaluated += shape[0] * shape[1]
+                self.metrics.sample()
                     
                 if verbose:
                     calc_time += time() - start
                     print(f"Calculations in {time() - start:.2f}s")
                     start = time()
-                    print_counter = 0  # Less prints with many chunks
                     chunks_done += 1
-                    
-                for aind in range(shape[0]):
-                    for bind in range(shape[1]):
-                        key = int(many_keys[aind, bind])
-                        if key in self.hash_table:  # find hits in hash table (bottleneck)
-                            results.append(Match(key, a_poly["coef"][aind], b_poly["coef"][bind]))
-                    
-                    if verbose:
-                        counter += shape[1]
-                        print_counter += shape[1]
-                        if print_counter >= 1_000_000:  # print status.
-                            print_counter = 0
-                            prediction = ((time() - start_results - calc_time)
-                                            *(num_iterations / counter)
-                                            + calc_time * chunks_total / chunks_done)
-                            time_left = ((time() - start_results - calc_time)
-                                            *(num_iterations / counter - 1)
-                                            + calc_time * (chunks_total / chunks_done - 1))
-                            print(f"Passed {counter:n} out of {num_iterations:n} "
-                                  f"({round(100. * counter / num_iterations, 2)}%). "
-                                  f"Found so far {len(results)} results. \n"
-                                  f"Time left ~{time_left:.0f}s of a total of {prediction:.0f}s")
+
+                # pairs worth a lookup in the hash table
+                with np.errstate(invalid='ignore'):
+                    candidates = self.poly_domains.filter_gcfs_block(a_poly["coef"], b_poly["coef"])
+                    candidates &= (many_keys >= min_key) & (many_keys <= max_key)  # false for nan
+                for aind, bind in zip(*np.nonzero(candidates)):
+                    key = int(many_keys[aind, bind])
+                    if key in self.hash_table:  # find hits in hash table (bottleneck)
+                        results.append(Match(key, a_poly["coef"][aind], b_poly["coef"][bind]))
+                counter += shape[0] * shape[1]
                 
                 if verbose: # Chunk complete
                     prediction = (time() - start_results)*(num_iterations / counter)
@@ -214,6 +209,8 @@ class ParallelGCFEnumerator(EfficientGCFEnumerator):
                           f"Time left {time_left} of a total of {prediction}")
                             
 
+        self.metrics.increment('pairs_evaluated', pairs_evaluated)
+        self.metrics.increment('pairs_filtered', num_iterations - pairs_evaluated)
         if verbose:
             print(f'created results after {time() - start_results:.2f}s')
         return results
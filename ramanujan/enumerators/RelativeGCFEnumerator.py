@@ -173,11 +173,14 @@ class RelativeGCFEnumerator(AbstractGCFEnumerator):
         results = []  # list of intermediate results        
         next_status_print = 100_000
         for i, (an_iter, bn_iter, metadata) in enumerate(self._iter_domains_with_cache(FIRST_STEP_MAX_ITERS)):
+            self.metrics.sample()
             try:
                 key, _ = gcf_calculation_to_precision(an_iter, bn_iter, g_N_initial_key_length, FIRST_STEP_MIN_ITERS,
                                                       FIRST_STEP_BURST_NUMBER)
             except (ZeroInAn, NotConverging, ZeroDivisionError):
+                self.metrics.increment('pairs_filtered')
                 continue
+            self.metrics.increment('pairs_evaluated')
 
             if key in self.hash_table:  # find hits in hash table
                 results.append(Match(key, metadata.an_coef, metadata.bn_coef))
@@ -223,10 +226,12 @@ class RelativeGCFEnumerator(AbstractGCFEnumerator):
             except NotConverging as e:
                 print(f"{res} does not converge. Continuing...")
                 print(e)
+                self.metrics.increment('false_positives')
                 continue
             except (ZeroInAn, ZeroDivisionError) as e:
                 print(f" exception for {res}. Continuing...")
                 print(e)
+                self.metrics.increment('false_positives')
                 continue
 
             rhs_val = mpmath.mpf(long_key) / key_factor
@@ -259,12 +264,16 @@ class RelativeGCFEnumerator(AbstractGCFEnumerator):
             try:
                 all_matches = self.hash_table.evaluate(res.lhs_key)
             except KeyError:
+                self.metrics.increment('false_positives')
                 continue
 
+            n_results = len(results)
             for i, match in enumerate(all_matches):
                 # Trunc the LHS to the number of digits actually calculated.
                 val_str = mpmath.nstr(match[0], precision + 1)[:-1]
                 if val_str == rhs_str:
                     results.append(RefinedMatch(*res, i, match[1], match[2], precision))
+            if len(results) == n_results:
+                self.metrics.increment('false_positives')
 
         return results
@@ -4,34 +4,44 @@ from copy import deepcopy
 
 class Dummy(object):
     """
-    When passing the lhs object to each process, only the bloom filter is used.
+    When passing the lhs object to each process, only the key filter is used.
     To pass less data to each process, we'll be using this class to duplicate only
-    the bloom filter. 
+    the key filter. 
     Also, passing LHSHashTable to a child process requires us to pickle it, which creates
     problems. This way, we only handle the required data when spawning a new process
     """
     pass
 
 
-def _single_process_execution(enumerator_class, lhs, poly_search_domain, const_vals):
+def _create_worker_enumerator(enumerator_class, lhs, poly_search_domain, const_vals):
     if lhs:
-        enumerator = enumerator_class(
-            lhs,
-            poly_search_domain,
-            const_vals)
+        enumerator = enumerator_class(lhs, poly_search_domain, const_vals)
     else:
-        enumerator = enumerator_class(
-            poly_search_domain,
-            const_vals)
+        enumerator = enumerator_class(poly_search_domain, const_vals)
+    # the workers' metrics are exported by the main process, after they are merged (see multiprocess_enumeration)
+    enumerator.metrics.hooks = []
+    return enumerator
+
+
+def _single_process_execution(enumerator_class, lhs, poly_search_domain, const_vals):
+    enumerator = _create_worker_enumerator(enumerator_class, lhs, poly_search_domain, const_vals)
+    return enumerator.find_initial_hits(), enumerator.metrics
+
+
+def _single_process_refinement(enumerator_class, lhs, poly_search_domain, const_vals, results):
+    enumerator = _create_worker_enumerator(enumerator_class, lhs, poly_search_domain, const_vals)
+    return enumerator.refine_results(results), enumerator.metrics
 
-    return enumerator.find_initial_hits()
 
 def multiprocess_enumeration(enumerator_class, lhs, poly_search_domain, const_vals, number_of_processes):
     """
     This function will split an execution to number_of_processes different processes the poly_domain will be split, and
     for each chunk an instance of lhs and enumerator will be created. Each instance will preform the first enumeration.
-    The refining process requires to load the LHS dict to memory. This will be done by  only one instance, when all
-    first enumerations are finished.
+    When all first enumerations are finished, the results are split again between the processes for refining. The
+    refining process requires to load the LHS dict to memory, so every process gets a read-only copy of the LHS (see
+    LHSHashTable.read_only_copy) that loads the dict from its file.
+    Metrics of the workers are merged into the metrics of an enumerator in this process, which is the only one that
+    exports them (see add_hooks_from_env in ramanujan/utils/metrics.py).
 
     :param enumerator_class: the CLASS (NOT an instance) of the requested enumerator
     :param lhs: an LHSHashTable object
@@ -43,35 +53,47 @@ def multiprocess_enumeration(enumerator_class, lhs, poly_search_domain, const_va
     pool = multiprocessing.Pool(processes=number_of_processes)
     arguments = []
     
-    # Each subprocess only uses lhs.bloom. See Dummy class doc for more details.
+    # Each subprocess only uses lhs.key_filter. See Dummy class doc for more details.
     lean_lhs = Dummy()
     # Some enumerators don't require the LHS, passing None instead
-    lean_lhs.bloom = lhs.bloom if lhs else None
+    lean_lhs.key_filter = lhs.key_filter if lhs else None
 
     # Creating arguments for each process function
     split_domain = poly_search_domain.split_domains_to_processes(number_of_processes)
     for domain_chunk in split_domain:
         arguments.append((
             enumerator_class,
-            lean_lhs.bloom,
+            lean_lhs.key_filter,
             domain_chunk,
             const_vals
             ))
 
     process_results = pool.starmap(_single_process_execution, arguments)
-    pool.close()
-    
-    unified_results = []
-    for r in process_results:
-        unified_results += r
 
-    # Create another enumerator (should not take time to initiate) and preforme 
-    # the second step using only it
+    # Create another enumerator (should not take time to initiate) to collect the results and metrics
     if lhs:
         enumerator = enumerator_class(lhs, poly_search_domain, const_vals)
     else:
         enumerator = enumerator_class(poly_search_domain, const_vals)
 
-    refined_results = enumerator.refine_results(unified_results)
+    unified_results = []
+    for r, metrics in process_results:
+        unified_results += r
+        enumerator.metrics.merge(metrics)
+    enumerator.metrics.sample(force=True)
+
+    # Refine in consecutive chunks, so the results keep their order
+    chunk_size = max(1, -(-len(unified_results) // number_of_processes))
+    read_only_lhs = lhs.read_only_copy() if lhs else None
+    arguments = [(enumerator_class, read_only_lhs, poly_search_domain, const_vals, unified_results[i:i + chunk_size])
+                 for i in range(0, len(unified_results), chunk_size)]
+    refined_chunks = pool.starmap(_single_process_refinement, arguments)
+    pool.close()
+
+    refined_results = []
+    for r, metrics in refined_chunks:
+        refined_results += r
+        enumerator.metrics.merge(metrics)
+    enumerator.metrics.sample(force=True)
 
     return refined_results
@@ -1,11 +1,54 @@
 from .AbstractPolyDomains import AbstractPolyDomains
-from ..utils.utils import iter_series_items_from_compact_poly
+from ..utils.utils import iter_series_items_from_compact_poly, get_series_items_from_iter
+from ..constants import g_N_initial_search_terms
 from itertools import product
+from collections import deque
 from copy import deepcopy
+from math import comb
 from numpy import array_split
+import numpy as np
 
 CHECKPOINT_DUMP_SIZE = 5_000
 ALLOW_LOWER_DEGREE = False
+IDENTITY_MOBIUS = ((1, 0), (0, 1))
+
+
+def _shift_matrix(length, shift):
+    """
+    :return: matrix T, such that T @ coefs are the coefficients of the compact poly coefs(n + shift)
+    """
+    deg = length - 1
+    matrix = np.zeros((length, length), dtype=np.int64)
+    for i in range(length):
+        # coefs[i] multiplies n^(deg - i), and (n + shift)^(deg - i) = sum of comb(deg - i, j) shift^(deg - i - j) n^j
+        for j in range(deg - i + 1):
+            matrix[deg - j, i] = comb(deg - i, j) * shift ** (deg - i - j)
+    return matrix
+
+
+def _shift_poly(coefs, shift):
+    """
+    :return: the coefficients of the compact poly coefs(n + shift)
+    """
+    coefs = list(coefs)
+    # Horner's scheme, repeated for every coefficient (Taylor shift)
+    for i in range(len(coefs) - 1):
+        for j in range(1, len(coefs) - i):
+            coefs[j] += shift * coefs[j - 1]
+    return tuple(coefs)
+
+
+def _eval_poly(coefs, n):
+    value = 0
+    for coef in coefs:
+        value = value * n + coef
+    return value
+
+
+def _mobius_product(m1, m2):
+    (a, b), (c, d) = m1
+    (e, f), (g, h) = m2
+    return (a * e + b * g, a * f + b * h), (c * e + d * g, c * f + d * h)
 
 
 class CartesianProductPolyDomain(AbstractPolyDomains):
@@ -14,7 +57,8 @@ class CartesianProductPolyDomain(AbstractPolyDomains):
     the two
     """
     def __init__(self, a_deg, a_coef_range, b_deg, b_coef_range, an_leading_coef_positive=True,
-                 only_balanced_degrees=False, use_strict_convergence_cond=False, *args, **kwargs):
+                 only_balanced_degrees=False, use_strict_convergence_cond=False, prune_equivalent_gcfs=False,
+                 *args, **kwargs):
         """
         a_deg - an's polynomial degree
         a_coef_range - The coefficient range iterated for every coefficient in an
@@ -27,6 +71,11 @@ class CartesianProductPolyDomain(AbstractPolyDomains):
             convergence conditions.
         use_strict_convergence_cond - discard cases when discriminate = 0. Read ramanujan machine paper for more
             information about convergence conditions.
+        prune_equivalent_gcfs - enumerate one GCF of every class of equivalent GCFs in the domain. GCFs are equivalent
+            if they are related by sign flips of an, scaling (an*c, bn*c^2) or shifts of n, so their values are Mobius
+            transformations of each other. Found GCFs are expanded back to their classes by expand_equivalence_class
+            (or AbstractGCFEnumerator.expand_results). Note that a GCF is found only if the value of the enumerated
+            GCF of its class is in the LHS table.
         """
         self.a_deg = a_deg
         # expanding the range to a different range for each coefficient
@@ -39,6 +88,12 @@ class CartesianProductPolyDomain(AbstractPolyDomains):
         self.b_coef_range = [b_coef_range for _ in range(b_deg + 1)]
         self.only_balanced_degrees = only_balanced_degrees
         self.use_strict_convergence_cond = use_strict_convergence_cond
+        self.prune_equivalent_gcfs = prune_equivalent_gcfs
+        compact_polys = CartesianProductPolyDomain.get_calculation_method()
+        if prune_equivalent_gcfs and self.get_calculation_method() != compact_polys:
+            raise ValueError('prune_equivalent_gcfs is supported only for domains of compact polys')
+        self._class_ranges = None
+        self._class_primes = None
 
         self._setup_metadata()
         super().__init__()
@@ -54,6 +109,7 @@ class CartesianProductPolyDomain(AbstractPolyDomains):
         self.num_iterations = self.an_length * self.bn_length
 
         self.an_domain_range, self.bn_domain_range = self.dump_domain_ranges()
+        self._class_masks = {}
 
     @staticmethod
     def _range_size(coef_range):
@@ -122,14 +178,10 @@ class CartesianProductPolyDomain(AbstractPolyDomains):
 
         return an_domain, bn_domain
 
-    def filter_gcfs(self, an_coefs, bn_coefs):
-        """
-        Some GCFs will not converge, and some are duplicates of other GCFs.
-        This function filter these cases out.
-        """
+    def _converges(self, an_coefs, bn_coefs):
         # For un-balanced degrees, we have no filtering conditions
         if (len(an_coefs) - 1) * 2 != len(bn_coefs) - 1:
-            return self.only_balanced_degrees
+            return not self.only_balanced_degrees
 
         # Discard non-converging cases
         if 4 * bn_coefs[0] < -1 * (an_coefs[0]**2):
@@ -141,6 +193,191 @@ class CartesianProductPolyDomain(AbstractPolyDomains):
 
         return True
 
+    def filter_gcfs(self, an_coefs, bn_coefs):
+        """
+        Some GCFs will not converge, and some are duplicates of other GCFs.
+        This function filter these cases out.
+        """
+        if not self._converges(an_coefs, bn_coefs):
+            return False
+
+        if self.prune_equivalent_gcfs:
+            return self._is_class_representative(an_coefs, bn_coefs)
+
+        return True
+
+    def filter_gcfs_block(self, an_coefs_list, bn_coefs_list):
+        """
+        filter_gcfs for every pair of an_coefs_list x bn_coefs_list. Used by enumerators that don't use iter_polys.
+        Domains that override filter_gcfs are filtered pair by pair, unless they override this function as well.
+        :return: boolean matrix, the [i, j] item is filter_gcfs(an_coefs_list[i], bn_coefs_list[j])
+        """
+        if type(self).filter_gcfs is not CartesianProductPolyDomain.filter_gcfs:
+            return np.array([[self.filter_gcfs(an_coefs, bn_coefs) for bn_coefs in bn_coefs_list]
+                             for an_coefs in an_coefs_list], dtype=bool).reshape(len(an_coefs_list), len(bn_coefs_list))
+
+        block = np.ones((len(an_coefs_list), len(bn_coefs_list)), dtype=bool)
+        if block.size == 0:
+            return block
+        if (len(an_coefs_list[0]) - 1) * 2 != len(bn_coefs_list[0]) - 1:
+            block[:] = not self.only_balanced_degrees
+        else:
+            a_leading_coefs = np.array([an_coefs[0] for an_coefs in an_coefs_list], dtype=np.int64)
+            b_leading_coefs = np.array([bn_coefs[0] for bn_coefs in bn_coefs_list], dtype=np.int64)
+            discriminant = 4 * b_leading_coefs[np.newaxis, :] + (a_leading_coefs ** 2)[:, np.newaxis]
+            block = discriminant > 0 if self.use_strict_convergence_cond else discriminant >= 0
+
+        if self.prune_equivalent_gcfs:
+            block &= self._class_representatives_block(an_coefs_list, bn_coefs_list)
+        return block
+
+    def _get_class_ranges(self):
+        """
+        The coefficient ranges in which equivalent GCFs are looked for. Sub-domains keep the ranges of the domain they
+        were split from (see split_domains_to_processes), since one of them enumerates the representative of a class.
+        """
+        if self._class_ranges is None:
+            self._class_ranges = (deepcopy(self.a_coef_range), deepcopy(self.b_coef_range))
+        return self._class_ranges
+
+    def _get_class_primes(self):
+        """
+        The primes c for which GCFs scaled by (an*c, bn*c^2) may be in the class ranges.
+        """
+        if self._class_primes is None:
+            from sympy import primerange  # sympy is slow to import, and only needed when pruning equivalent GCFs
+            a_ranges, _ = self._get_class_ranges()
+            self._class_primes = list(primerange(2, max(max(abs(r[0]), abs(r[1])) for r in a_ranges) + 1))
+        return self._class_primes
+
+    @staticmethod
+    def _in_ranges(coefs, ranges):
+        ranges = np.array(ranges, dtype=np.int64).reshape(-1, 2)
+        return np.all((coefs >= ranges[:, 0]) & (coefs <= ranges[:, 1]), axis=1)
+
+    @staticmethod
+    def _poly_in_ranges(coefs, ranges):
+        return all(r[0] <= c <= r[1] for c, r in zip(coefs, ranges))
+
+    def _get_class_masks(self, coefs_list, series):
+        """
+        Properties of every poly in coefs_list, used by _class_representatives_block. Enumerators filter many blocks
+        with the same list of an or bn, so the properties of the last list of each series are kept.
+        :return: dict of boolean arrays
+        """
+        cached_list, masks = self._class_masks.get(series, (None, None))
+        if cached_list is coefs_list:
+            return masks
+
+        a_ranges, b_ranges = self._get_class_ranges()
+        ranges = a_ranges if series == 'a' else b_ranges
+        coefs = np.array(coefs_list, dtype=np.int64).reshape(len(coefs_list), -1)
+        masks = {
+            # items n=1 of the shifted series (see _class_representatives_block) must not be 0
+            'shifted': (coefs[:, -1] != 0) & self._in_ranges(coefs @ _shift_matrix(coefs.shape[1], -1).T, ranges),
+            'constant': np.all(coefs[:, :-1] == 0, axis=1)
+        }
+        if series == 'a':
+            leading_coefs = coefs[np.arange(len(coefs)), np.argmax(coefs != 0, axis=1)]
+            masks['flipped'] = (leading_coefs < 0) & self._in_ranges(-coefs, ranges)
+        for p in self._get_class_primes():
+            c = p if series == 'a' else p * p
+            masks[p] = np.all(coefs % c == 0, axis=1) & self._in_ranges(coefs // c, ranges)
+
+        self._class_masks[series] = (coefs_list, masks)
+        return masks
+
+    def _class_representatives_block(self, an_coefs_list, bn_coefs_list):
+        """
+        A GCF is dropped if an equivalent GCF that is enumerated as well is "smaller": the same GCF with -an, with
+        (an/c, bn/c^2), or with (an(n-1), bn(n-1)). Following such steps ends in a GCF that is kept, so one GCF of
+        every class is enumerated.
+        :return: boolean matrix, the [i, j] item is True if (an_coefs_list[i], bn_coefs_list[j]) is kept
+        """
+        a_masks = self._get_class_masks(an_coefs_list, 'a')
+        b_masks = self._get_class_masks(bn_coefs_list, 'b')
+
+        # sign flip: -an converges to minus the value
+        dropped = np.repeat(a_masks['flipped'][:, np.newaxis], len(bn_coefs_list), axis=1)
+
+        # shift: (an(n-1), bn(n-1)) converges to an(-1) + bn(0) / value. GCFs with constant an and bn are their own
+        # shifts.
+        dropped |= (a_masks['shifted'][:, np.newaxis] & b_masks['shifted'][np.newaxis, :] &
+                    ~(a_masks['constant'][:, np.newaxis] & b_masks['constant'][np.newaxis, :]))
+
+        # scaling: (an/c, bn/c^2) converges to the value divided by c. it's enough to check prime c
+        for p in a_masks:
+            if isinstance(p, int):
+                dropped |= a_masks[p][:, np.newaxis] & b_masks[p][np.newaxis, :]
+
+        return ~dropped
+
+    def _is_class_representative(self, an_coefs, bn_coefs):
+        """
+        _class_representatives_block of a single pair. filter_gcfs is called pair by pair (e.g. by iter_polys), so the
+        pair is checked without building the masks of _get_class_masks.
+        """
+        a_ranges, b_ranges = self._get_class_ranges()
+        if next((c for c in an_coefs if c != 0), 0) < 0 and self._poly_in_ranges([-c for c in an_coefs], a_ranges):
+            return False
+
+        if an_coefs[-1] != 0 and bn_coefs[-1] != 0 and \
+                not (all(c == 0 for c in an_coefs[:-1]) and all(c == 0 for c in bn_coefs[:-1])) and \
+                self._poly_in_ranges(_shift_poly(an_coefs, -1), a_ranges) and \
+                self._poly_in_ranges(_shift_poly(bn_coefs, -1), b_ranges):
+            return False
+
+        for p in self._get_class_primes():
+            if all(c % p == 0 for c in an_coefs) and all(c % (p * p) == 0 for c in bn_coefs) and \
+                    self._poly_in_ranges([c // p for c in an_coefs], a_ranges) and \
+                    self._poly_in_ranges([c // (p * p) for c in bn_coefs], b_ranges):
+                return False
+
+        return True
+
+    def _is_enumerated(self, an_coefs, bn_coefs):
+        """
+        :return: True if the GCF is in the class ranges and passes the filters of the enumerators (before pruning).
+        """
+        a_ranges, b_ranges = self._get_class_ranges()
+        if not self._in_ranges(np.array([an_coefs]), a_ranges)[0] or \
+                not self._in_ranges(np.array([bn_coefs]), b_ranges)[0]:
+            return False
+        if self.only_balanced_degrees and (an_coefs[0] == 0 or bn_coefs[0] == 0):
+            return False
+        an = get_series_items_from_iter(iter_series_items_from_compact_poly, an_coefs, g_N_initial_search_terms)
+        bn = get_series_items_from_iter(iter_series_items_from_compact_poly, bn_coefs, g_N_initial_search_terms)
+        return 0 not in an[1:] and 0 not in bn[1:] and self._converges(an_coefs, bn_coefs)
+
+    def expand_equivalence_class(self, an_coefs, bn_coefs):
+        """
+        Find all GCFs of the domain that are equivalent to the given one (see prune_equivalent_gcfs).
+        :return: list of (an_coefs, bn_coefs, mobius) starting with the given GCF. mobius is ((p, q), (r, s)), such
+            that if the given GCF converges to x, the equivalent GCF converges to (p*x + q) / (r*x + s).
+        """
+        an_coefs, bn_coefs = tuple(an_coefs), tuple(bn_coefs)
+        primes = self._get_class_primes()
+
+        def equivalent_gcfs(an, bn):
+            yield tuple(-c for c in an), bn, ((-1, 0), (0, 1))
+            yield _shift_poly(an, -1), _shift_poly(bn, -1), ((_eval_poly(an, -1), _eval_poly(bn, 0)), (1, 0))
+            yield _shift_poly(an, 1), _shift_poly(bn, 1), ((0, _eval_poly(bn, 1)), (1, -_eval_poly(an, 0)))
+            for p in primes:
+                yield tuple(c * p for c in an), tuple(c * p * p for c in bn), ((p, 0), (0, 1))
+                if all(c % p == 0 for c in an) and all(c % (p * p) == 0 for c in bn):
+                    yield tuple(c // p for c in an), tuple(c // (p * p) for c in bn), ((1, 0), (0, p))
+
+        gcfs = {(an_coefs, bn_coefs): IDENTITY_MOBIUS}
+        queue = deque([(an_coefs, bn_coefs)])
+        while queue:
+            an, bn = queue.popleft()
+            for next_an, next_bn, step in equivalent_gcfs(an, bn):
+                if (next_an, next_bn) not in gcfs and self._is_enumerated(next_an, next_bn):
+                    gcfs[(next_an, next_bn)] = _mobius_product(step, gcfs[(an, bn)])
+                    queue.append((next_an, next_bn))
+
+        return [(an, bn, mobius) for (an, bn), mobius in gcfs.items()]
+
     def iter_polys(self, primary_looped_domain):
         """
         This function iterate pairs of an and bn coefficients from the domain.
@@ -206,6 +443,8 @@ class CartesianProductPolyDomain(AbstractPolyDomains):
         This function will split the domain to number_of_instances sub-domains. To do so, we'll find the coefficient
         with the biggest range, and split it as evenly as possible to different instances.
         """
+        if self.prune_equivalent_gcfs:
+            self._get_class_ranges()
         all_coef_ranges = self._get_metadata_on_var_ranges(self.a_coef_range, 'a')
         all_coef_ranges += self._get_metadata_on_var_ranges(self.b_coef_range, 'b')
 
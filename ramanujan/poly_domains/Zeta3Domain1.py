@@ -1,5 +1,6 @@
 from .CartesianProductPolyDomain import CartesianProductPolyDomain
 from itertools import product
+import numpy as np
 
 
 class Zeta3Domain1(CartesianProductPolyDomain):
@@ -78,6 +79,15 @@ class Zeta3Domain1(CartesianProductPolyDomain):
 		# checking for >= as well as >, might be overkill
 		return bn_coefs[0] * 4 >= -1 * (a_leading_coef**2)
 
+	def filter_gcfs(self, an_coefs, bn_coefs):
+		return self.check_for_convergence(an_coefs, bn_coefs)
+
+	def filter_gcfs_block(self, an_coefs_list, bn_coefs_list):
+		# vectorized check_for_convergence
+		a_leading_coefs = np.array([an_coefs[0] * an_coefs[2] for an_coefs in an_coefs_list], dtype=np.int64)
+		b_leading_coefs = np.array([bn_coefs[0] for bn_coefs in bn_coefs_list], dtype=np.int64)
+		return b_leading_coefs[np.newaxis, :] * 4 >= -1 * (a_leading_coefs ** 2)[:, np.newaxis]
+
 	def iter_polys(self, primary_looped_domain):
 		an_domain, bn_domain = self.dump_domain_ranges()
 
@@ -1,10 +1,92 @@
-import matplotlib.pyplot as plt
-import mpmath
+import math
+import numpy as np
 from mpmath import mpf as dec
 from ramanujan.utils.mobius import GeneralizedContinuedFraction
 
+# default number of GCF terms used to calculate the convergence rate
+DEFAULT_CONVERGENCE_DEPTH = 200
+LOG10_2 = math.log10(2)
 
-def calculate_convergence(gcf: GeneralizedContinuedFraction, reference, plot=False, title=''):
+
+def _log10_abs(x):
+    """
+    log10(|x|) of a python int or an mpf, taken from its bit length (mantissa and exponent) instead of mpmath.log10.
+    this is accurate to double precision, which is more than enough for convergence rates.
+    """
+    if isinstance(x, int):
+        return math.log10(abs(x)) if x != 0 else -math.inf
+    x = dec(x)
+    if x == 0:
+        return -math.inf
+    return math.log10(x.man) + x.exp * LOG10_2
+
+
+def _log_error(p, q, reference):
+    """
+    log10(|p/q - reference|) without dividing p by q in high precision.
+    """
+    if q == 0:
+        return _log10_abs(reference)  # convergent is taken as 0
+    return _log10_abs(p - reference * q) - _log10_abs(q)
+
+
+def _sampled_log_errors(gcfs, references, length, sampled_depths):
+    """
+    calculate log10 of the difference between the convergents of several GCFs and their references.
+    the convergents of all GCFs are advanced together (as columns of numpy object arrays), and the difference is only
+    calculated on the sampled depths.
+    :param gcfs: GCFs with at least length terms.
+    :param references: values to compare every GCF to.
+    :param length: number of terms to use.
+    :param sampled_depths: sorted depths (0 to length-1) in which to calculate the difference.
+    :return: for each GCF, a list of log differences, one for each sampled depth.
+    """
+    a_ = np.array([gcf.a_[:length] for gcf in gcfs], dtype=object).reshape(len(gcfs), length)
+    b_ = np.array([gcf.b_[:length] for gcf in gcfs], dtype=object).reshape(len(gcfs), length)
+    prev_q = np.zeros(len(gcfs), dtype=object)
+    q = np.ones(len(gcfs), dtype=object)
+    prev_p = np.ones(len(gcfs), dtype=object)
+    p = a_[:, 0].copy()
+
+    log_diff = [[] for _ in gcfs]
+    next_sample = 0
+    for i in range(length):
+        if i > 0:
+            prev_q, q = q, a_[:, i] * q + b_[:, i - 1] * prev_q
+            prev_p, p = p, a_[:, i] * p + b_[:, i - 1] * prev_p
+        if next_sample < len(sampled_depths) and sampled_depths[next_sample] == i:
+            next_sample += 1
+            for j in range(len(gcfs)):
+                log_diff[j].append(_log_error(p[j], q[j], references[j]))
+    return log_diff
+
+
+def calculate_convergence_rates(gcfs, references, depth=DEFAULT_CONVERGENCE_DEPTH):
+    """
+    calculate the convergence rates of many General Continued Fractions in one call (see calculate_convergence).
+    GCFs of the same length are calculated together.
+    :param gcfs: list of General Continued Fractions.
+    :param references: list of constants, one for each GCF.
+    :param depth: maximal number of terms to use (GCFs with less terms will use all of their terms).
+    :return: list of convergence rates, in the same order as gcfs.
+    """
+    rates = [None] * len(gcfs)
+    lengths = {}
+    for i, gcf in enumerate(gcfs):
+        lengths.setdefault(min(depth, len(gcf.b_)), []).append(i)
+
+    for length, indices in lengths.items():
+        sampled_depths = sorted({length // 2, length - 1})
+        log_diffs = _sampled_log_errors([gcfs[i] for i in indices], [references[i] for i in indices],
+                                        length, sampled_depths)
+        for i, log_diff in zip(indices, log_diffs):
+            log_slope = 2 * (log_diff[-1] - log_diff[0]) / length
+            rates[i] = dec(-log_slope)
+    return rates
+
+
+def calculate_convergence(gcf: GeneralizedContinuedFraction, reference, plot=False, title='',
+                          depth=DEFAULT_CONVERGENCE_DEPTH):
     """
     calculate convergence rate of General Continued Fraction (in reference to some constant x).
     the result is the average number of decimal digits, per term of the general continued fraction.
@@ -12,25 +94,13 @@ def calculate_convergence(gcf: GeneralizedContinuedFraction, reference, plot=Fal
     :param gcf: General Continued Fraction to calculate.
     :param title: (optional) title of graph.
     :param reference: x
+    :param depth: (optional) maximal number of terms to use.
     """
-    q_ = [0, 1]
-    p_ = [1, gcf.a_[0]]
-    log_diff = [mpmath.log10(abs((dec(p_[1]) / dec(q_[1])) - reference))]
-    length = min(200, len(gcf.b_))
-    for i in range(1, length):
-        q_.append(gcf.a_[i] * q_[i] + gcf.b_[i - 1] * q_[i - 1])
-        p_.append(gcf.a_[i] * p_[i] + gcf.b_[i - 1] * p_[i - 1])
-        if q_[i + 1] == 0:
-            part_convergent = 0
-        else:
-            part_convergent = dec(p_[i + 1]) / dec(q_[i + 1])
-        if not mpmath.isfinite(part_convergent):
-            length = i
-            break
-        log_diff.append(mpmath.log10(abs(part_convergent - reference)))
     if plot:
+        import matplotlib.pyplot as plt  # only imported when plotting
+        length = min(depth, len(gcf.b_))
+        log_diff = _sampled_log_errors([gcf], [reference], length, range(length))[0]
         plt.plot(range(length), log_diff)
         plt.title(title)
         plt.show()
-    log_slope = 2 * (log_diff[length-1] - log_diff[length//2]) / length
-    return -log_slope
+    return calculate_convergence_rates([gcf], [reference], depth)[0]
@@ -0,0 +1,151 @@
+"""
+Counters, gauges and stage timers of an enumeration, with optional sampling hooks that export them while it runs.
+Counters used by the enumerators:
+    pairs_evaluated - (an, bn) pairs whose GCF was calculated and looked up in the LHS table.
+    pairs_filtered - pairs that were skipped without calculation (e.g. a zero in an or bn, or no convergence).
+    bloom_hits - pairs that were found in the LHS table in the first enumeration.
+    filter_lookups, filter_bloom_passed, filter_fingerprint_rejected - lookups in the LHS key filter, and how many of
+        them passed its bloom filter and were then rejected by the key fingerprints (see LHSKeyFilter).
+    false_positives - hits that did not match any LHS value when refined.
+    results - refined results.
+Hooks can also be added without changing code, by setting RAMANUJAN_METRICS_FILE to the path of a json lines file (or
+of a Prometheus text file, if it ends with .prom).
+"""
+import os
+import json
+from time import time, perf_counter
+from contextlib import contextmanager
+
+METRICS_FILE_ENV = 'RAMANUJAN_METRICS_FILE'
+DEFAULT_SAMPLE_INTERVAL = 60  # seconds
+
+
+class Metrics(object):
+    def __init__(self, labels=None):
+        """
+        :param labels: (optional) dictionary of labels that identify the run (e.g. the enumerator).
+        """
+        self.labels = dict(labels or {})
+        self.counters = {}
+        self.gauges = {}
+        self.timers = {}  # stage name -> [total seconds, number of calls]
+        self.hooks = []  # [hook, interval, time of next sample]
+
+    def increment(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    @contextmanager
+    def stage(self, name):
+        """
+        time a stage. hooks are sampled when the stage ends.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            timer = self.timers.setdefault(name, [0., 0])
+            timer[0] += perf_counter() - start
+            timer[1] += 1
+            self.sample(force=True)
+
+    def add_hook(self, hook, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        :param hook: function that gets this object. called at most once every interval seconds (see sample).
+        :param interval: seconds between calls.
+        """
+        self.hooks.append([hook, interval, time() + interval])
+
+    def sample(self, force=False):
+        """
+        call the hooks whose interval has passed. this is cheap enough to call every iteration of an outer loop.
+        :param force: call all hooks.
+        """
+        if not self.hooks:
+            return
+        now = time()
+        for hook_entry in self.hooks:
+            hook, interval, next_sample = hook_entry
+            if force or now >= next_sample:
+                hook_entry[2] = now + interval
+                hook(self)
+
+    def merge(self, other):
+        """
+        add the counters and stage timers of other (e.g. of a worker process) to this object.
+        """
+        for name, value in other.counters.items():
+            self.increment(name, value)
+        for name, (seconds, calls) in other.timers.items():
+            timer = self.timers.setdefault(name, [0., 0])
+            timer[0] += seconds
+            timer[1] += calls
+        self.gauges.update(other.gauges)
+
+    def snapshot(self):
+        return {'time': time(), 'pid': os.getpid(), 'labels': self.labels, 'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'stages': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.timers.items()}}
+
+    def to_json_line(self):
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix='ramanujan'):
+        """
+        :return: the metrics in Prometheus text exposition format.
+        """
+        labels = ','.join('{}="{}"'.format(key, value) for key, value in sorted(self.labels.items()))
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines += ['# TYPE {}_{}_total counter'.format(prefix, name),
+                      '{}_{}_total{{{}}} {}'.format(prefix, name, labels, value)]
+        for name, value in sorted(self.gauges.items()):
+            lines += ['# TYPE {}_{} gauge'.format(prefix, name), '{}_{}{{{}}} {}'.format(prefix, name, labels, value)]
+        if self.timers:
+            stage_labels = ['{}stage="{}"'.format(labels + ',' if labels else '', name) for name in self.timers]
+            lines.append('# TYPE {}_stage_seconds_total counter'.format(prefix))
+            lines += ['{}_stage_seconds_total{{{}}} {}'.format(prefix, stage_label, seconds)
+                      for stage_label, (seconds, _) in zip(stage_labels, self.timers.values())]
+            lines.append('# TYPE {}_stage_calls_total counter'.format(prefix))
+            lines += ['{}_stage_calls_total{{{}}} {}'.format(prefix, stage_label, calls)
+                      for stage_label, (_, calls) in zip(stage_labels, self.timers.values())]
+        return '\n'.join(lines) + '\n'
+
+
+class JsonLinesExporter(object):
+    """
+    hook that appends a snapshot of the metrics to a json lines file.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, metrics):
+        with open(self.path, 'a') as f:
+            f.write(metrics.to_json_line() + '\n')
+
+
+class PrometheusExporter(object):
+    """
+    hook that writes the metrics to a Prometheus text file (e.g. for the node exporter textfile collector).
+    the file is replaced atomically, so it is never read half written.
+    """
+    def __init__(self, path, prefix='ramanujan'):
+        self.path = path
+        self.prefix = prefix
+
+    def __call__(self, metrics):
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            f.write(metrics.to_prometheus(self.prefix))
+        os.replace(tmp_path, self.path)
+
+
+def add_hooks_from_env(metrics):
+    """
+    add an exporter to metrics if RAMANUJAN_METRICS_FILE is set.
+    """
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        metrics.add_hook(PrometheusExporter(path) if path.endswith('.prom') else JsonLinesExporter(path))
@@ -1,9 +1,13 @@
 import numpy as np
-from math import gcd, floor, ceil
+from copy import copy
+from math import gcd, floor
 from mpmath import mpf as dec
 import mpmath
-from sympy import Symbol, pprint
-from ortools.linear_solver.pywraplp import Solver
+
+# GeneralizedContinuedFraction.from_irrational_constant starts with this number of bits, and doubles it when needed
+INITIAL_EXTRACTION_PREC = 128
+# extra bits used when evaluating the constant, to absorb rounding errors of const_gen
+EXTRACTION_GUARD_BITS = 32
 
 
 class MobiusTransform(object):
@@ -30,12 +34,13 @@ class MobiusTransform(object):
         a, b, c, d = self.__values()
         return (a*x + b) / (c*x + d)
 
-    def pprint(self, x=Symbol('x')):
+    def pprint(self, x=None):
         """
         pretty print the mobius transform.
-        :param x: (optional) expression to print as the operand of the transformation
+        :param x: (optional) expression to print as the operand of the transformation (default is the symbol x)
         """
-        sym = self.sym_expression(x)
+        from sympy import Symbol, pprint
+        sym = self.sym_expression(Symbol('x') if x is None else x)
         pprint(sym)
 
     def __mul__(self, other):
@@ -154,9 +159,14 @@ class GeneralizedContinuedFraction(object):
         """
         self.a_ = (self.a_ + a_).copy()
         self.b_ = (self.b_ + b_).copy()
+        # same as self.mobius *= MobiusTransform([[0, b_i], [1, a_i+1]]) for every i, without the numpy overhead
+        a, b, c, d = (int(x) for x in self.mobius.data.flatten())
         for i in range(min(len(a_) - 1, len(b_))):
-            mat = np.array([[0, b_[i]], [1, a_[i + 1]]], dtype=object)
-            self.mobius *= MobiusTransform(mat)
+            a, b, c, d = b, a * b_[i] + b * a_[i + 1], d, c * b_[i] + d * a_[i + 1]
+            divider = gcd(gcd(a, b), gcd(c, d))
+            if divider != 1:
+                a, b, c, d = a // divider, b // divider, c // divider, d // divider
+        self.mobius = MobiusTransform(np.array([[a, b], [c, d]], dtype=object))
 
     def __len__(self, item):
         return len(self.a_)
@@ -168,6 +178,7 @@ class GeneralizedContinuedFraction(object):
         :param n: depth of convergent
         :return: sym expression
         """
+        from sympy import Symbol
         x = Symbol('..')
         eq = x
         for i in reversed(range(n)):
@@ -179,6 +190,7 @@ class GeneralizedContinuedFraction(object):
         pretty print the GCF
         :param n: depth to print
         """
+        from sympy import pprint
         pprint(self.sym_expression(n))
 
     @classmethod
@@ -189,25 +201,29 @@ class GeneralizedContinuedFraction(object):
             2) a_i = floor(tmp)
             3) x = 1/x - a_i
         instead of calculating on x, we calculate the transforms along the way on x.
-        TODO - wasteful to calculate beyond first decimal point.. in (**)
+
+        the transform is kept as 4 integers, and applied on an interval that bounds the constant (see
+        _const_to_interval). if both edges of the interval agree on a_i, it is exact. otherwise, the constant is
+        evaluated again with twice the bits, up to the precision of the calling scope. this way most of the
+        extraction is done in low precision, and the resulting a_ is the same as extracting in full precision.
         :param const_gen: must be a generator function (implemented const_gen()). this will give us the constant
         :type const_gen: function
         :param b_: series of nominators for the generalized continued fraction
         """
-        const = const_gen()  # could be useful to have better precision along the way
-        a_ = [floor(const) if b_[0] > 0 else ceil(const)]
-        k = MobiusTransform(np.array([[1, -a_[0]], [0, 1]]))  # x = x - a[0]
-        for i in range(1, len(b_)):
-            k_rcp = MobiusTransform(np.array([[0, b_[i - 1]], [1, 0]], dtype=object)) * k  # 1) calculate floor(b[i]/x)
-            try:
-                rcp = k_rcp(const)  # 1) (**)
-            except ZeroDivisionError:
-                print("Finished extraction sooner than expected. Rational input, or insufficient precision.")
-                raise ZeroDivisionError
-            a_.append(floor(rcp) if b_[i] > 0 else ceil(rcp))  # 2) find a_i
-            next_transform = MobiusTransform(np.array([[0, b_[i-1]], [1, a_[i]]], dtype=object))  # 3) x = b[i]/x - a[i]
-            k = next_transform.inverse() * k
-        return cls(a_, b_)
+        return cls(list(cls.iter_partial_quotients(const_gen, b_)), b_)
+
+    @staticmethod
+    def iter_partial_quotients(const_gen, b_):
+        """
+        same as from_irrational_constant, but yields a_ one term at a time. this lets the caller stop the extraction
+        early (e.g. once the series is known to be uninteresting).
+        the precision is taken from the scope of the first call to next().
+        :param const_gen: must be a generator function (implemented const_gen()). this will give us the constant
+        :param b_: series of nominators for the generalized continued fraction
+        """
+        extractor = PartialQuotientExtractor(const_gen)
+        for b_i in b_:
+            yield extractor.extract(b_i)
 
     def __eq__(self, other):
         if not isinstance(other, GeneralizedContinuedFraction):
@@ -219,6 +235,58 @@ class GeneralizedContinuedFraction(object):
         return True
 
 
+class PartialQuotientExtractor(object):
+    def __init__(self, const_gen):
+        """
+        the state of GeneralizedContinuedFraction.from_irrational_constant after some terms were extracted.
+        it can be copied, to extract several GCFs whose b_ series start the same way (from the point they differ).
+        the precision is taken from the calling scope.
+        :param const_gen: must be a generator function (implemented const_gen()). this will give us the constant
+        """
+        self.const_gen = const_gen
+        self.max_prec = mpmath.mp.prec
+        self.prec = min(INITIAL_EXTRACTION_PREC, self.max_prec)
+        self.interval = _const_to_interval(const_gen, self.prec, self.max_prec)
+        self.transform = (1, 0, 0, 1)  # k(x) = (p*x + q) / (r*x + s), starting with k(x) = x
+        self.b_prev = None  # b_ of the previous term, None before a_0 is extracted
+
+    def copy(self):
+        return copy(self)
+
+    def extract(self, b_i):
+        """
+        extract the next partial quotient (see from_irrational_constant).
+        :param b_i: next item of the b_ series.
+        :return: a_i
+        """
+        p, q, r, s = self.transform
+        b_prev = self.b_prev
+        while True:
+            if b_prev is None:
+                a_i = _extract_partial_quotient(p, q, r, s, b_i > 0, *self.interval)
+            else:  # 1) calculate floor(b[i]/x)
+                a_i = _extract_partial_quotient(b_prev * r, b_prev * s, p, q, b_i > 0, *self.interval)
+            if a_i is not None:
+                break
+            # interval is too wide for the current precision
+            if self.prec >= self.max_prec:
+                print("Finished extraction sooner than expected. Rational input, or insufficient precision.")
+                raise ZeroDivisionError
+            self.prec = min(2 * self.prec, self.max_prec)
+            self.interval = _const_to_interval(self.const_gen, self.prec, self.max_prec)
+        # 2) found a_i
+        if b_prev is None:
+            p, q, r, s = 1, -a_i, 0, 1  # x = x - a[0]
+        else:  # 3) x = b[i]/x - a[i]
+            p, q, r, s = a_i * p - b_prev * r, a_i * q - b_prev * s, -p, -q
+            divider = gcd(gcd(p, q), gcd(r, s))
+            if divider != 1:
+                p, q, r, s = p // divider, q // divider, r // divider, s // divider
+        self.transform = (p, q, r, s)
+        self.b_prev = b_i
+        return a_i
+
+
 class SimpleContinuedFraction(GeneralizedContinuedFraction):
     def __init__(self, a_=None):
         """
@@ -278,6 +346,55 @@ class EfficientGCF(object):
         return dec(self.B) / dec(self.A)
 
 
+def _const_to_interval(const_gen, prec, max_prec):
+    """
+    evaluate the constant and bound it by an interval of width ~2^-prec (relative to the constant).
+    once max_prec is reached, the constant is evaluated at max_prec and the interval is a single point.
+    :param const_gen: generator function for the constant
+    :param prec: required precision in bits
+    :param max_prec: maximal precision in bits (the precision of the calling scope)
+    :return: low, high, scale such that low/scale <= const <= high/scale
+    """
+    exact = prec >= max_prec
+    with mpmath.workprec(max_prec if exact else prec + EXTRACTION_GUARD_BITS):
+        const = dec(const_gen())
+    if exact:
+        radius = 0
+    else:
+        radius = 1 << EXTRACTION_GUARD_BITS
+    if const == 0:
+        return -radius, radius, 1 << (prec + EXTRACTION_GUARD_BITS)
+    man, exp = const.man, const.exp
+    shift = prec + EXTRACTION_GUARD_BITS - man.bit_length()
+    if shift > 0:  # const is short (e.g. 1.5), pad with zeros so the radius is relative to the constant
+        man <<= shift
+        exp -= shift
+    if const < 0:
+        man = -man
+    if exp >= 0:
+        return (man - radius) << exp, (man + radius) << exp, 1
+    return man - radius, man + radius, 1 << -exp
+
+
+def _extract_partial_quotient(num_x, num_1, den_x, den_1, use_floor, low, high, scale):
+    """
+    find floor (or ceil) of the mobius transform (num_x*x + num_1) / (den_x*x + den_1), for all x in the interval
+    [low/scale, high/scale]. a mobius transform is monotonic between its poles, so checking the edges is enough.
+    :return: the partial quotient, or None if the interval is too wide to determine it (or contains a pole).
+    """
+    den_low = den_x * low + den_1 * scale
+    den_high = den_x * high + den_1 * scale
+    if den_low == 0 or den_high == 0 or (den_low > 0) != (den_high > 0):
+        return None
+    num_low = num_x * low + num_1 * scale
+    num_high = num_x * high + num_1 * scale
+    if use_floor:
+        a_low, a_high = num_low // den_low, num_high // den_high
+    else:
+        a_low, a_high = -(-num_low // den_low), -(-num_high // den_high)
+    return a_low if a_low == a_high else None
+
+
 def find_transform(x, y, limit, threshold=1e-7):
     """
     find a integer solution to ax + b - cxy - dy = 0
@@ -288,6 +405,7 @@ def find_transform(x, y, limit, threshold=1e-7):
     :param threshold: optimal solution threshold.
     :return MobiusTransform in case of success or None.
     """
+    from ortools.linear_solver.pywraplp import Solver  # ortools is slow to import, and only used here
     x1 = x
     x2 = dec(1.0)
     x3 = -x*y
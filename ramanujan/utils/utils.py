@@ -1,9 +1,10 @@
-import numpy as np
 from typing import List
 import time
 import mpmath
-import matplotlib.pyplot as plt
-from sympy import lambdify, var, Poly
+import numpy as np
+from fractions import Fraction
+from functools import reduce, lru_cache
+from math import gcd, comb, factorial
 
 
 def trunc_division(p, q):
@@ -30,25 +31,121 @@ def measure_performance(func):
     return wrapper
 
 
+@lru_cache(maxsize=None)
+def _get_interpolation_matrix(poly_deg, starting_n):
+    """
+    Integer matrix T, such that T @ [x(starting_n), ..., x(starting_n + poly_deg)] / poly_deg! gives the coefficients
+    (starting with the free coefficient) of the polynomial x(n) of degree poly_deg that passes through those points.
+    Built from Newton's forward differences formula:
+        x(n) = sum over k of (delta^k x)(starting_n) * (n - starting_n)(n - starting_n - 1)...(n - starting_n - k + 1) / k!
+    where (delta^k x)(starting_n) = sum over j of (-1)^(k-j) * binomial(k, j) * x(starting_n + j)
+    """
+    matrix = [[0] * (poly_deg + 1) for _ in range(poly_deg + 1)]
+    falling_factorial = [1]  # coefficients of (n - starting_n)...(n - starting_n - k + 1), starting with n^0
+    for k in range(poly_deg + 1):
+        scale = factorial(poly_deg) // factorial(k)
+        for j in range(k + 1):
+            difference_coef = (-1) ** (k - j) * comb(k, j) * scale
+            for i, coef in enumerate(falling_factorial):
+                matrix[i][j] += difference_coef * coef
+        # multiply falling_factorial by (n - starting_n - k)
+        root = starting_n + k
+        falling_factorial = [(falling_factorial[i - 1] if i > 0 else 0) -
+                             root * (falling_factorial[i] if i < len(falling_factorial) else 0)
+                             for i in range(len(falling_factorial) + 1)]
+    return tuple(tuple(row) for row in matrix)
+
+
 def find_polynomial_series_coefficients(poly_deg, lead_terms: List[int], starting_n=0):
     """
-    find polynomial coefficients of polynomial integer series, by solving linear equations.
+    find polynomial coefficients of polynomial integer series, by exact interpolation.
     :param poly_deg: degree of polynomial
     :param lead_terms: list of the first few terms of the series (must be at least poly_deg+1)
     :param starting_n: what index does the series start from (default is 0).
-    :return: list of polynomial coefficients (starting with the lead term)
-    """
-    assert (poly_deg+1) <= len(lead_terms)
-    mat = np.array([[n**i for i in range(poly_deg+1)] for n in range(starting_n, starting_n+poly_deg+1)])
-    x = np.array(lead_terms[:poly_deg+1])
-    coefs = np.linalg.inv(mat) @ x
-    coefs = np.flip(coefs)
-    int_coefs = np.round(coefs)
-    if any(np.abs(int_coefs-coefs) > 10e-7):
-        print('warning! non integer coefficients - {}'.format(coefs))
-        return list(coefs)
-    else:
-        return list(int_coefs.astype(int))
+    :return: list of polynomial coefficients (starting with the lead term). Coefficients are fractions.Fraction if
+        the series is not an integer polynomial.
+    """
+    return find_polynomial_series_coefficients_batch(poly_deg, [lead_terms], starting_n)[0]
+
+
+def find_polynomial_series_coefficients_batch(poly_deg, lead_terms_list: List[List[int]], starting_n=0):
+    """
+    find polynomial coefficients of many polynomial integer series of the same degree, by exact interpolation.
+    :param poly_deg: degree of polynomials
+    :param lead_terms_list: list of series, each holds the first few terms of a series (at least poly_deg+1)
+    :param starting_n: what index does every series start from (default is 0).
+    :return: list of polynomial coefficients (starting with the lead term) for every series
+    """
+    matrix = _get_interpolation_matrix(poly_deg, starting_n)
+    denominator = factorial(poly_deg)
+    all_coefs = []
+    for lead_terms in lead_terms_list:
+        assert (poly_deg+1) <= len(lead_terms)
+        lead_terms = [int(i) for i in lead_terms[:poly_deg+1]]
+        coefs = [sum(t * x for t, x in zip(row, lead_terms)) for row in reversed(matrix)]
+        if any(c % denominator != 0 for c in coefs):
+            coefs = [Fraction(c, denominator) for c in coefs]
+            print('warning! non integer coefficients - {}'.format(coefs))
+        else:
+            coefs = [c // denominator for c in coefs]
+        all_coefs.append(coefs)
+    return all_coefs
+
+
+INT64_MAX = 2 ** 63 - 1
+
+
+def create_linear_recurrence_series(shift_reg, initials, n):
+    """
+    generate a series from a linear recurrence (LFSR): A[i] = sum j=1 to deg(P): -(P[j] * A[i-j])
+    the last deg(P) terms are kept as a sliding window, and only nonzero coefficients of P are used.
+    :param shift_reg: P(x), with P[0] = 1 (same format as the massey algorithm output).
+    :param initials: first deg(P) terms of the series.
+    :param n: number of terms to generate.
+    :return: list of n terms.
+    """
+    taps = [(-j, -c) for j, c in enumerate(shift_reg[1:], 1) if c != 0]
+    a_ = list(initials)
+    append = a_.append
+    for _ in range(len(a_), n):
+        a_i = 0
+        for j, c in taps:
+            a_i += c * a_[j]
+        append(a_i)
+    return a_[:n]
+
+
+def create_linear_recurrence_series_batch(shift_regs, initials_list, n):
+    """
+    generate many series from linear recurrences (see create_linear_recurrence_series).
+    every series of a recurrence is a linear combination of the deg(P) series with unit initial conditions (the rows
+    of the powers of the companion matrix), weighted by its initial conditions. so for series that share a recurrence,
+    the basis series are generated once, and the series are calculated together as a matrix product (in int64 when
+    the terms are small enough).
+    :param shift_regs: list of P(x), one for each series.
+    :param initials_list: list of initial conditions, one for each series.
+    :param n: number of terms to generate.
+    :return: list of series (lists of n terms), in the same order as shift_regs.
+    """
+    groups = {}
+    for i, shift_reg in enumerate(shift_regs):
+        groups.setdefault(tuple(shift_reg), []).append(i)
+    series = [None] * len(shift_regs)
+    for shift_reg, indices in groups.items():
+        deg = len(shift_reg) - 1
+        if deg == 0 or len(indices) <= deg:  # no basis, or generating it would take longer than the series
+            for i in indices:
+                series[i] = create_linear_recurrence_series(shift_reg, initials_list[i], n)
+            continue
+        basis = [create_linear_recurrence_series(shift_reg, [int(j == k) for j in range(deg)], n) for k in range(deg)]
+        weights = [initials_list[i] for i in indices]
+        bound = max(abs(a) for row in basis for a in row) * max(sum(abs(w) for w in row) for row in weights)
+        dtype = np.int64 if bound <= INT64_MAX else object
+        group_series = np.array(weights, dtype=dtype).reshape(len(indices), deg).dot(
+            np.array(basis, dtype=dtype).reshape(deg, n))
+        for i, a_ in zip(indices, group_series.tolist()):
+            series[i] = a_
+    return series
 
 
 def get_poly_deg_and_leading_coef(poly_coef):
@@ -75,6 +172,7 @@ def create_mpf_const_generator(sym_constants):
     Returns a generator that creates an mpf objects from sympy constants
     This allows us to get an object that matches the scope's mpf's workdps
     """
+    from sympy import lambdify  # sympy is slow to import, and not needed by most users of this module
     constants_generator = []
     for i in range(len(sym_constants)):
         try:
@@ -105,6 +203,7 @@ def iter_series_items_from_compact_poly(poly_coef, max_runs, start_n=1):
 
 
 def plot_gcf_convergens(an_poly_coef, bn_poly_coef, max_iters, divide_interval=101, label=None):
+    import matplotlib.pyplot as plt  # only imported when plotting
     computed_values = []
     label = f'an {an_poly_coef} bn {bn_poly_coef}' if not label else label
 
@@ -174,26 +273,109 @@ def plot_gcf_convergens(an_poly_coef, bn_poly_coef, max_iters, divide_interval=1
     return computed_values
 
 
+def _trim_poly(poly_coefs):
+    """ Remove zeros from the end of a coefficients list (highest degrees) """
+    poly_coefs = list(poly_coefs)
+    while poly_coefs and poly_coefs[-1] == 0:
+        poly_coefs.pop()
+    return poly_coefs
+
+
+def _primitive_poly(poly_coefs):
+    """ Divide a (trimmed) integer polynomial by its content, and make its leading coefficient positive """
+    content = reduce(gcd, poly_coefs)
+    if poly_coefs[-1] < 0:
+        content = -content
+    return [coef // content for coef in poly_coefs]
+
+
+def _pseudo_remainder(poly_a, poly_b):
+    """ Remainder of lc(b)^k * a divided by b, calculated over the integers (lists are trimmed) """
+    remainder = list(poly_a)
+    while len(remainder) >= len(poly_b):
+        shift = len(remainder) - len(poly_b)
+        lead = remainder[-1]
+        remainder = [poly_b[-1] * coef for coef in remainder]
+        for i, coef in enumerate(poly_b):
+            remainder[i + shift] -= lead * coef
+        remainder = _trim_poly(remainder)
+    return remainder
+
+
+def _exact_poly_division(poly_a, poly_b):
+    """ Divide integer polynomials, when poly_b is known to divide poly_a (lists are trimmed) """
+    remainder = list(poly_a)
+    quotient = [0] * (len(poly_a) - len(poly_b) + 1)
+    for shift in reversed(range(len(quotient))):
+        quotient[shift] = remainder[shift + len(poly_b) - 1] // poly_b[-1]
+        for i, coef in enumerate(poly_b):
+            remainder[i + shift] -= quotient[shift] * coef
+    return quotient
+
+
+def get_poly_gcd(poly_a, poly_b):
+    """
+    Greatest common divisor of two integer polynomials, using the primitive polynomial remainder sequence.
+    Items in the coefs lists start from the lowest degree ([a, b, c] = a + b*x +c*x**2)
+    :return: The primitive gcd (content 1, positive leading coefficient), trimmed. [] if both polynomials are 0.
+    """
+    poly_a, poly_b = _trim_poly(poly_a), _trim_poly(poly_b)
+    if not poly_a or not poly_b:
+        return _primitive_poly(poly_a or poly_b) if (poly_a or poly_b) else []
+    poly_a, poly_b = _primitive_poly(poly_a), _primitive_poly(poly_b)
+    if len(poly_a) < len(poly_b):
+        poly_a, poly_b = poly_b, poly_a
+    while poly_b:
+        remainder = _pseudo_remainder(poly_a, poly_b)
+        poly_a, poly_b = poly_b, _primitive_poly(remainder) if remainder else []
+    return poly_a
+
+
+def _is_negative_poly(poly_coefs):
+    """
+    Sign convention for the reduced fraction's denominator (the same one sympy uses to print expressions):
+    a polynomial is negative if it has more negative coefficients than positive ones. On a tie, the leading
+    coefficient decides.
+    """
+    n_positive = sum(1 for coef in poly_coefs if coef > 0)
+    n_negative = sum(1 for coef in poly_coefs if coef < 0)
+    if n_positive != n_negative:
+        return n_negative > n_positive
+    return poly_coefs[-1] < 0
+
+
 def get_reduced_fraction(numerator_coefs, denominator_coefs, result_deg):
     """
     Reduce polynomial division by common factors. So (1+k)/(1+2k+k**2) will be reduced to 1/(1+k)
     Items in the coefs list start from the lowest degree ([a, b, c] = a + b*x +c*x**2)
+    The result has no common content, and the denominator is positive (see _is_negative_poly).
+    This used to be done with sympy's simplify, and gives the same results except for (in a few percent of random
+    fractions):
+    1. The sign. simplify kept whichever of +-P/Q its operation count preferred, so (-1-5k)/(3+7k-2k**2) was
+       returned as (1+5k)/(-3-7k+2k**2). The sign here only depends on the denominator.
+    2. Denominators c*k**m. simplify multiplied both polynomials by another k, returning lists longer than
+       result_deg + 1, so (2+5k-4k**2)/(k**2) was returned as (2k+5k**2-4k**3)/(k**3). Here they are fully reduced.
     """
-    k = var('k')
-    numerator = sum([coef * k**i for i, coef in enumerate(numerator_coefs)])
-    denominator = sum([coef * k**i for i, coef in enumerate(denominator_coefs)])
+    numerator = _trim_poly(int(i) for i in numerator_coefs)
+    denominator = _trim_poly(int(i) for i in denominator_coefs)
+    if not denominator:
+        raise ZeroDivisionError('Denominator of reduced fraction is 0')
 
-    reduced_num, reduced_denom = (numerator/denominator).simplify().as_numer_denom()
-    reduced_num_coefs, reduced_denom_coefs = Poly(reduced_num, k).all_coeffs(), Poly(reduced_denom, k).all_coeffs()
-    reduced_num_coefs.reverse()
-    reduced_denom_coefs.reverse()
+    if not numerator:
+        reduced_num_coefs, reduced_denom_coefs = [], [1]
+    else:
+        common_factor = get_poly_gcd(numerator, denominator)
+        reduced_num_coefs = _exact_poly_division(numerator, common_factor)
+        reduced_denom_coefs = _exact_poly_division(denominator, common_factor)
+        content = reduce(gcd, reduced_num_coefs + reduced_denom_coefs)
+        if _is_negative_poly(reduced_denom_coefs):
+            content = -content
+        reduced_num_coefs = [i // content for i in reduced_num_coefs]
+        reduced_denom_coefs = [i // content for i in reduced_denom_coefs]
 
     # If the higher degrees are missing from the expression, then the list will have a smaller size then needed.
     # Adding zeros as padding to the end.
     reduced_num_coefs += [0] * (result_deg + 1 - len(reduced_num_coefs))
     reduced_denom_coefs += [0] * (result_deg + 1 - len(reduced_denom_coefs))
 
-    reduced_num_coefs = [int(i) for i in reduced_num_coefs]
-    reduced_denom_coefs = [int(i) for i in reduced_denom_coefs]
-
     return reduced_num_coefs, reduced_denom_coefs
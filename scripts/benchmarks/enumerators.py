@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+"""
+Benchmarks of the enumerators' hot paths on fixed domains, so performance can be compared across versions.
+Every benchmark is run in a fresh interpreter (so the memory high-water mark is its own), and reports:
+    items - size of the searched domain (an, bn pairs for enumerators, LHS entries or sequences for the others).
+    seconds, items_per_second - total time of the stages (without loading LHS tables, unless that is the benchmark).
+    stages - time of every stage (e.g. first enumeration, precision improvement and refinement of an enumerator, see
+             Metrics.stage in ramanujan/utils/metrics.py).
+    max_rss_mb - peak resident memory of the process (and of its child processes, if any).
+LHS tables are built in the work directory before the first run, and are only loaded while benchmarking.
+Run from the repository root, e.g.:
+    python scripts/benchmarks/enumerators.py --repeats 3 --json > before.json
+    python scripts/benchmarks/enumerators.py --repeats 3 --baseline before.json
+"""
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), 'ramanujan_benchmarks')
+# a benchmark is reported as a regression when it is slower than the baseline by more than this ratio
+DEFAULT_TOLERANCE = 0.1
+# stages that prepare a benchmark. they are reported, but not counted in its time (unless they are all it does).
+SETUP_STAGES = {'lhs_load'}
+
+
+def _timed(metrics, stage, func, *args, **kwargs):
+    with metrics.stage(stage):
+        return func(*args, **kwargs)
+
+
+def _zeta3():
+    from ramanujan.constants import g_const_dict
+    return g_const_dict['zeta'](3)
+
+
+def _catalan():
+    from ramanujan.constants import g_const_dict
+    return g_const_dict['catalan']
+
+
+def _zeta3_lhs():
+    from ramanujan.LHSHashTable import LHSHashTable
+    return LHSHashTable('zeta3.lhs.dept14.db', 14, [_zeta3()])
+
+
+def _catalan_lhs():
+    from ramanujan.LHSHashTable import LHSHashTable
+    return LHSHashTable('catalan.lhs.dept10.db', 10, [_catalan()])
+
+
+def _zeta3_domain():
+    # a part of the domain of scripts/paper_results/zeta3_results.py, which has 4 results
+    from ramanujan.poly_domains.Zeta3Domain1 import Zeta3Domain1
+    return Zeta3Domain1([(2, 2), (1, 1), (1, 40), (1, 40)], (-20, -1))
+
+
+def _catalan_domain():
+    from ramanujan.poly_domains.CatalanDomain import CatalanDomain
+    return CatalanDomain((-10, 10), 2, ((-4, -1), (-2, 2)))
+
+
+def _enumerator_benchmark(enumerator_name, create_lhs, create_domain, create_constant):
+    """
+    :return: a benchmark of a GCF enumerator, searching the domain of create_domain against the LHS of create_lhs.
+    """
+    def benchmark(metrics, prepare=False):
+        from importlib import import_module
+        lhs = _timed(metrics, 'lhs_load', create_lhs)
+        if prepare:
+            return None
+        domain = create_domain()
+        enumerator_class = getattr(import_module('ramanujan.enumerators.' + enumerator_name), enumerator_name)
+        enumerator = enumerator_class(lhs, domain, [create_constant()])
+        results = enumerator.full_execution()
+        metrics.merge(enumerator.metrics)
+        return {'items': domain.num_iterations, 'results': len(results)}
+    return benchmark
+
+
+def fr_benchmark(metrics, prepare=False):
+    # a part of the domain of tests/conjectures_tests.py test_fr_enumerator
+    from ramanujan.enumerators.FREnumerator import FREnumerator
+    from ramanujan.poly_domains.Zeta3Domain2 import Zeta3Domain2
+    if prepare:
+        return None
+    domain = Zeta3Domain2([(1, 3), (-10, 10)], (1, 2))
+    enumerator = FREnumerator(domain, [_zeta3()])
+    results = enumerator.full_execution()
+    metrics.merge(enumerator.metrics)
+    return {'items': domain.num_iterations, 'results': len(results)}
+
+
+def lhs_build_benchmark(metrics, prepare=False):
+    from ramanujan.LHSHashTable import LHSHashTable
+    if prepare:
+        return None
+    name = 'lhs_build_benchmark.db'
+    if os.path.exists(name):
+        os.remove(name)
+    lhs = _timed(metrics, 'lhs_build', LHSHashTable, name, 10, [_zeta3()])
+    os.remove(name)
+    return {'items': lhs.max_capacity}
+
+
+def lhs_load_benchmark(metrics, prepare=False):
+    lhs = _timed(metrics, 'lhs_load', _zeta3_lhs)
+    return None if prepare else {'items': lhs.max_capacity}
+
+
+def massey_benchmark(metrics, prepare=False):
+    """
+    slow_massey over a fixed set of sequences: half are periodic (short LFSR), half are random.
+    """
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'ESMA'))
+    from massey import slow_massey
+    if prepare:
+        return None
+    prime = 199
+    rand = random.Random(0)
+    sequences = []
+    for i in range(2000):
+        if i % 2 == 0:
+            period = [rand.randrange(prime) for _ in range(rand.randint(1, 12))]
+            sequences.append([period[j % len(period)] for j in range(100)])
+        else:
+            sequences.append([rand.randrange(prime) for _ in range(100)])
+    _timed(metrics, 'massey', lambda: [slow_massey(sequence, prime) for sequence in sequences])
+    return {'items': len(sequences)}
+
+
+BENCHMARKS = {
+    'efficient_zeta3': _enumerator_benchmark('EfficientGCFEnumerator', _zeta3_lhs, _zeta3_domain, _zeta3),
+    'parallel_zeta3': _enumerator_benchmark('ParallelGCFEnumerator', _zeta3_lhs, _zeta3_domain, _zeta3),
+    'relative_zeta3': _enumerator_benchmark('RelativeGCFEnumerator', _zeta3_lhs, _zeta3_domain, _zeta3),
+    'efficient_catalan': _enumerator_benchmark('EfficientGCFEnumerator', _catalan_lhs, _catalan_domain, _catalan),
+    'fr_zeta3': fr_benchmark,
+    'lhs_build': lhs_build_benchmark,
+    'lhs_load': lhs_load_benchmark,
+    'slow_massey': massey_benchmark,
+}
+
+
+def _max_rss_mb():
+    import resource
+    max_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return max_rss / 2 ** 20 if sys.platform == 'darwin' else max_rss / 2 ** 10  # bytes on mac, KB elsewhere
+
+
+def run_in_process(name, prepare):
+    """
+    run a benchmark in this process (called in a fresh interpreter by run_benchmark), and print the measurement.
+    """
+    from ramanujan.utils.metrics import Metrics
+    metrics = Metrics()
+    with redirect_stdout(sys.stderr):  # enumerators print their progress
+        measurement = BENCHMARKS[name](metrics, prepare)
+    if not prepare:
+        stages = {stage: seconds for stage, (seconds, _) in metrics.timers.items()}
+        measurement.update(stages=stages, max_rss_mb=_max_rss_mb())
+        print(json.dumps(measurement))
+
+
+def _run_subprocess(name, work_dir, prepare=False):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    args = [sys.executable, os.path.abspath(__file__), '--run', name] + (['--prepare'] if prepare else [])
+    process = subprocess.run(args, cwd=work_dir, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        # a process that was killed (e.g. by the OOM killer) may not write anything
+        errors = process.stderr.strip().splitlines()
+        raise RuntimeError(errors[-1] if errors else 'exited with code {}'.format(process.returncode))
+    return None if prepare else json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(name, work_dir, repeats):
+    """
+    run a benchmark repeats times, each in a fresh interpreter.
+    :param name: benchmark name (see BENCHMARKS).
+    :param work_dir: directory for LHS tables.
+    :param repeats: number of measurements.
+    :return: dictionary with the median time of every stage, the total, throughput and memory high-water mark. If
+             the benchmark failed, a dictionary with the error.
+    """
+    try:
+        _run_subprocess(name, work_dir, prepare=True)
+        measurements = [_run_subprocess(name, work_dir) for _ in range(repeats)]
+    except RuntimeError as e:
+        return {'benchmark': name, 'error': str(e)}
+    stages = {stage: statistics.median(m['stages'].get(stage, 0) for m in measurements)
+              for stage in measurements[0]['stages']}
+    timed_stages = [stage for stage in stages if stage not in SETUP_STAGES] or list(stages)
+    seconds = statistics.median(sum(m['stages'][stage] for stage in timed_stages) for m in measurements)
+    items = measurements[0]['items']
+    result = {'benchmark': name, 'items': items, 'seconds': seconds,
+              'items_per_second': items / seconds if seconds else None, 'stages': stages,
+              'max_rss_mb': max(m['max_rss_mb'] for m in measurements), 'repeats': repeats}
+    if 'results' in measurements[0]:
+        result['results'] = measurements[0]['results']
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_to_baseline(result, baseline, tolerance):
+    """
+    :return: relative slowdown of result compared to the baseline measurement, and whether it is a regression.
+    """
+    slowdown = result['seconds'] / baseline['seconds'] - 1
+    return slowdown, slowdown > tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark the enumerators on fixed domains')
+    parser.add_argument('benchmarks', nargs='*', default=list(BENCHMARKS),
+                        help='benchmarks to run (default: all): ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--repeats', type=int, default=3, help='number of fresh interpreters per benchmark')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK_DIR, help='directory for LHS tables')
+    parser.add_argument('--json', action='store_true', help='print results as json lines')
+    parser.add_argument('--baseline', help='json lines of a previous run to compare to')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='slowdown (relative to the baseline) reported as a regression')
+    parser.add_argument('--run', choices=list(BENCHMARKS), help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_in_process(args.run, args.prepare)
+        return
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmarks: ' + ', '.join(unknown))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {m['benchmark']: m for m in map(json.loads, f) if 'seconds' in m}
+    os.makedirs(args.work_dir, exist_ok=True)
+    revision = _git_revision()
+    regressions = 0
+    for name in args.benchmarks:
+        result = run_benchmark(name, args.work_dir, args.repeats)
+        result.update(revision=revision, python=sys.version.split()[0])
+        if name in baseline and 'seconds' in result:
+            result['slowdown'], regression = compare_to_baseline(result, baseline[name], args.tolerance)
+            regressions += regression
+        if args.json:
+            print(json.dumps(result), flush=True)
+        elif 'error' in result:
+            print(f"{name:<18} failed: {result['error']}", flush=True)
+        else:
+            stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in result['stages'].items())
+            comparison = f" ({result['slowdown']:+.0%} vs baseline)" if 'slowdown' in result else ''
+            print(f"{name:<18} {result['items']:>10} items {result['seconds']:8.2f}s "
+                  f"{result['items_per_second'] or 0:12.1f} items/s {result['max_rss_mb']:8.1f} MB{comparison}"
+                  f"\n{'':<18} {stages}", flush=True)
+    if regressions:
+        sys.exit(f'{regressions} benchmarks are slower than the baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+"""
+Measures the startup time of the modules that workers (multiprocessing / BOINC) import before they can start enumerating.
+Every import is timed in a fresh interpreter, since modules are cached after the first import.
+Run from the repository root, e.g.:
+    python scripts/benchmarks/import_time.py --repeats 5 --json
+"""
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+WORKER_MODULES = [
+    'ramanujan.LHSHashTable',
+    'ramanujan.enumerators.EfficientGCFEnumerator',
+    'ramanujan.enumerators.FREnumerator',
+    'ramanujan.multiprocess_enumeration',
+    'scripts.boinc.execute_from_json',
+]
+# modules that take a significant part of the startup time when they are imported
+HEAVY_MODULES = ['sympy', 'matplotlib', 'ortools', 'pylatex']
+
+MEASURE_IMPORT = """
+import sys, json, time
+start = time.perf_counter()
+__import__({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module, repeats):
+    """
+    import module in a fresh interpreter, repeats times.
+    :param module: name of the module to import.
+    :param repeats: number of measurements.
+    :return: dictionary with the median import time and the heavy modules that were imported along the way.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    times = []
+    heavy = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', MEASURE_IMPORT.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=REPO_ROOT, env=env, check=True, capture_output=True, text=True).stdout
+        measurement = json.loads(output.strip().splitlines()[-1])
+        times.append(measurement['seconds'])
+        heavy = measurement['heavy']
+    return {'module': module, 'median_seconds': statistics.median(times), 'min_seconds': min(times),
+            'repeats': repeats, 'heavy_modules': heavy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='measure the import time of worker entry points')
+    parser.add_argument('modules', nargs='*', default=WORKER_MODULES, help='modules to import (default: workers)')
+    parser.add_argument('--repeats', type=int, default=5, help='number of fresh interpreters per module')
+    parser.add_argument('--json', action='store_true', help='print results as json lines')
+    args = parser.parse_args()
+
+    for module in args.modules:
+        result = measure_import(module, args.repeats)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{result['module']:<50} {result['median_seconds'] * 1000:8.1f} ms "
+                  f"(heavy modules: {', '.join(result['heavy_modules']) or 'none'})")
+
+
+if __name__ == '__main__':
+    main()
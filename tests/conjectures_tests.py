@@ -1,4 +1,5 @@
 import unittest
+from itertools import product
 import mpmath
 from ramanujan.LHSHashTable import LHSHashTable
 from ramanujan.enumerators.EfficientGCFEnumerator import EfficientGCFEnumerator
@@ -104,7 +105,9 @@ class APITests(unittest.TestCase):
             )
 
         results = enumerator.full_execution()
-        self.assertEqual(len(results), 46)
+        self.assertEqual(len(results), 49)
+        # found only with key_tolerance, the GCF's key is one off the LHS key
+        self.assertIn(((3, 7), (-2, -7, -3), (12, 3), (4, 0)), get_testable_data(results))
 
     def test_MITM_multiprocessing(self):
         """
@@ -152,6 +155,34 @@ class APITests(unittest.TestCase):
             ((2, 1, 51, 15), (-9,), (18, 0), (0, 1)),
             results)
 
+    def test_MITM_multiprocessing_e(self):
+        """
+        This is the same test as test_MITM_api1, but using multiprocessing. Unlike zeta(3), the constant e is an mpmath
+        constant, so this also tests that the LHS copy sent to the refinement processes can be pickled.
+        """
+        lhs = LHSHashTable('e_lhs_dept5_db', 5, [g_const_dict['e']])
+
+        poly_search_domain = CartesianProductPolyDomain(
+            1, [-5, 5],
+            1, [-5, 5])
+
+        results = multiprocess_enumeration(
+            EfficientGCFEnumerator,
+            lhs,
+            poly_search_domain,
+            [g_const_dict['e']],
+            4)
+
+        results = get_testable_data(results)
+
+        self.assertEqual(len(results), 20)
+        self.assertIn(
+            ((4, 2), (0, 1), (1, 1), (-1, 1)),
+            results)
+        self.assertIn(
+            ((1, 1), (1, 0), (1, 0), (-2, 1)),
+            results)
+
     def test_poly_domain_split(self):
         """
         making sure that the domain is split correctly
@@ -189,6 +220,52 @@ class APITests(unittest.TestCase):
         compare_domains(original_zeta_domain, original_zeta_domain.split_domains_to_processes(7))
         compare_domains(original_zeta_domain, original_zeta_domain.split_domains_to_processes(51))
 
+    def test_filter_gcfs_block(self):
+        domains = [CartesianProductPolyDomain(1, [-3, 3], 2, [-3, 3], use_strict_convergence_cond=True),
+                   CartesianProductPolyDomain(1, [-3, 3], 3, [-2, 2]),
+                   Zeta3Domain1([(1, 2), (-1, 1), (0, 2), (-1, 1)], (-5, -1)),
+                   Zeta3Domain2([(1, 3), (-3, 3)], (1, 3))]
+        # filter_gcfs checks single pairs of pruned domains without the masks of the block
+        domains += CartesianProductPolyDomain(1, [-4, 4], 2, [-3, 3], prune_equivalent_gcfs=True) \
+            .split_domains_to_processes(2)
+        for domain in domains:
+            an_coefs_list = list(domain.get_a_coef_iterator())
+            bn_coefs_list = list(domain.get_b_coef_iterator())
+            block = domain.filter_gcfs_block(an_coefs_list, bn_coefs_list)
+            self.assertEqual(block.tolist(), [[domain.filter_gcfs(an_coefs, bn_coefs) for bn_coefs in bn_coefs_list]
+                                              for an_coefs in an_coefs_list])
+            self.assertEqual(int(block.sum()), len(list(domain.iter_polys('a'))))
+
+    def test_prune_equivalent_gcfs(self):
+        domain = CartesianProductPolyDomain(1, [-3, 3], 1, [-4, 4], prune_equivalent_gcfs=True)
+        enumerated = [(an_coefs, bn_coefs) for an_coefs, bn_coefs in product(domain.get_a_coef_iterator(),
+                                                                             domain.get_b_coef_iterator())
+                      if domain._is_enumerated(an_coefs, bn_coefs)]
+        representatives = [gcf for gcf in enumerated if domain.filter_gcfs(*gcf)]
+        self.assertLess(len(representatives), len(enumerated))
+        expanded = [(an_coefs, bn_coefs) for gcf in representatives
+                    for an_coefs, bn_coefs, _ in domain.expand_equivalence_class(*gcf)]
+        self.assertEqual(sorted(expanded), sorted(enumerated))
+        self.assertEqual(sum(int(sub_domain.filter_gcfs_block(list(sub_domain.get_a_coef_iterator()),
+                                                              list(sub_domain.get_b_coef_iterator())).sum())
+                             for sub_domain in domain.split_domains_to_processes(3)),
+                         int(domain.filter_gcfs_block(list(domain.get_a_coef_iterator()),
+                                                      list(domain.get_b_coef_iterator())).sum()))
+
+        lhs = LHSHashTable('e_lhs_dept5_db', 5, [g_const_dict['e']])
+        enumerator = EfficientGCFEnumerator(
+            lhs, CartesianProductPolyDomain(1, [-5, 5], 1, [-5, 5], prune_equivalent_gcfs=True), [g_const_dict['e']])
+        expanded_results = enumerator.expand_results(enumerator.full_execution())
+        results = get_testable_data(expanded_results)
+        self.assertEqual(len(results), 32)
+        # the LHS of the added results is normalized like the LHS table's, and they can be printed
+        for res in expanded_results:
+            self.assertGreater(LHSHashTable.prod(res.c_top, [mpmath.e]), 0)
+        enumerator.print_results(expanded_results)
+        # found by test_MITM_api1 without pruning
+        self.assertIn(((4, 2), (0, 1), (1, 1), (-1, 1)), results)
+        self.assertIn(((1, 1), (1, 0), (1, 0), (-2, 1)), results)
+
     def test_gcf_calculation_to_precision(self):
         with mpmath.workdps(200):
             # "regular" GCF that converges quickly
@@ -0,0 +1,90 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+import mpmath
+import sympy
+
+from ramanujan.LHSHashTable import LHSHashTable, LHSKeyFilter
+
+
+class TestLHSKeyFilter(TestCase):
+    def test_membership(self):
+        keys = ['1234567890', '-42', str(2**40 + 7)]
+        key_filter = LHSKeyFilter(keys, 10)
+        for key in keys:
+            self.assertIn(int(key), key_filter)
+        for key in range(-100, 0):
+            if key != -42:
+                self.assertNotIn(key, key_filter)
+        stats = key_filter.stats()
+        self.assertEqual(stats['filter_lookups'], 102)
+        self.assertEqual(stats['filter_bloom_passed'] - stats['filter_fingerprint_rejected'], 3)
+
+    def test_add_keys(self):
+        key_filter = LHSKeyFilter(['1'], 10)
+        key_filter.add_keys(['2', '3'])
+        self.assertEqual(list(key_filter.fingerprints), [1, 2, 3])
+        self.assertIn(3, key_filter)
+
+    def test_tolerance(self):
+        key_filter = LHSKeyFilter(['100', str(2**32)], 10, tolerance=2)
+        for key in [98, 100, 102, 2**32 - 2, 2**32 + 2]:
+            self.assertIn(key, key_filter)
+        for key in [97, 103, 2**32 - 3, 2**32 + 3]:
+            self.assertNotIn(key, key_filter)
+
+
+class TestLHSHashTable(TestCase):
+    def test_read_only_copy(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            lhs = LHSHashTable(os.path.join(work_dir, 'e.lhs.dept2.db'), 2, [sympy.E])
+            key = int((1 + mpmath.e) / 2 * 10**10)
+            self.assertIn(key, lhs)
+            lhs_copy = pickle.loads(pickle.dumps(lhs.read_only_copy()))
+            self.assertIsNone(lhs_copy.key_filter)
+            self.assertEqual(lhs.evaluate(key), lhs_copy.evaluate(key))
+            # off by one from the stored key
+            self.assertIn(key + 1, lhs)
+            self.assertEqual(lhs.evaluate(key + 1)[0][1:], lhs.evaluate(key)[0][1:])
+
+    def test_evaluate_cache(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            lhs = LHSHashTable(os.path.join(work_dir, 'e.lhs.dept2.db'), 2, [sympy.E], evaluate_cache_size=1)
+            key = int((1 + mpmath.e) / 2 * 10**10)
+            with mpmath.workdps(100):
+                value = lhs.evaluate(key)[0][0]
+                self.assertEqual(lhs.evaluate(key)[0][0], value)
+            with mpmath.workdps(200):
+                self.assertAlmostEqual(lhs.evaluate(key)[0][0], (1 + mpmath.e) / 2, 190)
+            self.assertEqual(len(lhs._evaluate_cache), 1)
+
+    def test_extend(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            full = LHSHashTable(os.path.join(work_dir, 'full.lhs.dept4.db'), 4, [sympy.E])
+            extended = LHSHashTable(os.path.join(work_dir, 'extended.lhs.dept2.db'), 2, [sympy.E])
+            extended.extend(3)
+            extended = LHSHashTable(os.path.join(work_dir, 'extended.lhs.dept4.db'), 4, [sympy.E])
+            self.assertEqual(extended.search_range, 4)
+            full_range, full_dict = LHSHashTable._read_file(full.s_name)
+            extended_range, extended_dict = LHSHashTable._read_file(extended.s_name)
+            self.assertEqual(extended_range, full_range)
+            self.assertEqual({key: sorted(values) for key, values in extended_dict.items()},
+                             {key: sorted(values) for key, values in full_dict.items()})
+            for key in full_dict:
+                self.assertIn(int(key), extended)
+
+    def test_legacy_file(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            full = LHSHashTable(os.path.join(work_dir, 'full.lhs.dept3.db'), 3, [sympy.E])
+            _, full_dict = LHSHashTable._read_file(full.s_name)
+            legacy = LHSHashTable(os.path.join(work_dir, 'legacy.lhs.dept2.db'), 2, [sympy.E])
+            _, legacy_dict = LHSHashTable._read_file(legacy.s_name)
+            with open(legacy.s_name, 'wb') as f:  # files without a header only store the dict
+                pickle.dump(legacy_dict, f)
+            legacy = LHSHashTable(os.path.join(work_dir, 'legacy.lhs.dept3.db'), 3, [sympy.E])
+            legacy_range, legacy_dict = LHSHashTable._read_file(legacy.s_name)
+            self.assertEqual(legacy_range, 3)
+            self.assertEqual({key: sorted(values) for key, values in legacy_dict.items()},
+                             {key: sorted(values) for key, values in full_dict.items()})
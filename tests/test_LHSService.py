@@ -0,0 +1,72 @@
+import os
+import pickle
+import socket
+import tempfile
+from unittest import TestCase
+
+import mpmath
+import sympy
+from multiprocessing import AuthenticationError
+
+from ramanujan.LHSHashTable import LHSHashTable
+from ramanujan.LHSService import LHSServer, LHSClient, LocalLHSClient, connect_lhs, key_path
+
+
+class TestLHSService(TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.lhs = LHSHashTable(os.path.join(self.work_dir.name, 'e.lhs.dept2.db'), 2, [sympy.E])
+        self.address = os.path.join(self.work_dir.name, 'lhs.sock')
+        self.key = int((1 + mpmath.e) / 2 * 10**10)
+
+    def tearDown(self):
+        self.work_dir.cleanup()
+
+    def check_client(self, client):
+        self.assertIn(self.key, client)
+        self.assertEqual(client.contains([self.key, 3]), [True, False])
+        with mpmath.workdps(100):
+            self.assertEqual(client.evaluate(self.key), self.lhs.evaluate(self.key))
+            self.assertEqual(client.evaluate_many([self.key, 3]), {self.key: self.lhs.evaluate(self.key)})
+        with self.assertRaises(KeyError):
+            client.evaluate(3)
+        self.assertEqual(client.evaluate_sym(self.key, [sympy.E]), self.lhs.evaluate_sym(self.key, [sympy.E]))
+
+    def test_server(self):
+        server = LHSServer(self.lhs, self.address)
+        server.start()
+        try:
+            client = LHSClient(self.address)
+            self.check_client(client)
+            # copies (e.g. in worker processes) connect again
+            self.check_client(pickle.loads(pickle.dumps(client)))
+            client.close()
+        finally:
+            server.close()
+
+    def test_server_socket(self):
+        server = LHSServer(self.lhs, self.address)
+        server.start()
+        try:
+            # a running server isn't replaced
+            with self.assertRaises(FileExistsError):
+                LHSServer(self.lhs, self.address)
+            # clients without the key are rejected, and the server keeps serving
+            with self.assertRaises(AuthenticationError):
+                LHSClient(self.address, authkey=b'wrong key')
+            client = LHSClient(self.address)
+            self.check_client(client)
+            client.close()
+        finally:
+            server.close()
+        self.assertFalse(os.path.exists(key_path(self.address)))
+        # a socket that was left by a server that is not running is replaced
+        with socket.socket(socket.AF_UNIX) as sock:
+            sock.bind(self.address)
+        self.assertIsInstance(connect_lhs(self.address, lambda: self.lhs), LocalLHSClient)
+        LHSServer(self.lhs, self.address).close()
+
+    def test_local_fallback(self):
+        client = connect_lhs(self.address, lambda: self.lhs)
+        self.assertIsInstance(client, LocalLHSClient)
+        self.check_client(client)
@@ -0,0 +1,54 @@
+import mpmath
+from unittest import TestCase
+from ramanujan.utils.mobius import GeneralizedContinuedFraction, SimpleContinuedFraction, PartialQuotientExtractor
+from ramanujan.utils.convergence_rate import calculate_convergence, calculate_convergence_rates
+
+
+class TestFromIrrationalConstant(TestCase):
+    def test_simple_continued_fraction(self):
+        with mpmath.workdps(500):
+            e_cf = SimpleContinuedFraction.from_irrational_constant(lambda: mpmath.e, 30)
+        expected = [2]
+        for k in range(1, 11):
+            expected += [1, 2 * k, 1]
+        self.assertEqual(e_cf.a_, expected[:30])
+
+    def test_signed_continued_fraction(self):
+        # a_ is extracted in low precision first, make sure it matches the GCF's value to full precision
+        b_ = ([1, -1, -1] * 34)[:100]
+        with mpmath.workdps(500):
+            gcf = GeneralizedContinuedFraction.from_irrational_constant(lambda: mpmath.e / (mpmath.e - 1), b_)
+            self.assertEqual(len(gcf.a_), 100)
+            self.assertLess(abs(gcf.evaluate() - mpmath.e / (mpmath.e - 1)), mpmath.mpf(10) ** -30)
+            terms = GeneralizedContinuedFraction.iter_partial_quotients(lambda: mpmath.e / (mpmath.e - 1), b_)
+            self.assertEqual([next(terms) for _ in range(10)], gcf.a_[:10])
+
+    def test_shared_prefix(self):
+        b_1, b_2 = [1, -1, 1] * 20, [1, -1, -1] * 20
+        with mpmath.workdps(300):
+            extractor = PartialQuotientExtractor(lambda: mpmath.pi)
+            prefix = [extractor.extract(b_i) for b_i in b_1[:2]]
+            branch = extractor.copy()
+            a_1 = prefix + [extractor.extract(b_i) for b_i in b_1[2:]]
+            a_2 = prefix + [branch.extract(b_i) for b_i in b_2[2:]]
+            self.assertEqual(a_1, GeneralizedContinuedFraction.from_irrational_constant(lambda: mpmath.pi, b_1).a_)
+            self.assertEqual(a_2, GeneralizedContinuedFraction.from_irrational_constant(lambda: mpmath.pi, b_2).a_)
+
+    def test_rational_input(self):
+        with mpmath.workdps(100):
+            with self.assertRaises(ZeroDivisionError):
+                SimpleContinuedFraction.from_irrational_constant(lambda: mpmath.mpf(7) / 4, 10)
+
+
+class TestConvergenceRate(TestCase):
+    def test_batch_matches_single(self):
+        with mpmath.workdps(1000):
+            e_cf = SimpleContinuedFraction.from_irrational_constant(lambda: mpmath.e, 300)
+            # 4/pi = 1 + 1^2/(3 + 2^2/(5 + ...)), converges much slower than e's simple continued fraction
+            pi_gcf = GeneralizedContinuedFraction([1] + [2 * n + 1 for n in range(1, 300)],
+                                                  [n ** 2 for n in range(1, 300)])
+            rates = calculate_convergence_rates([e_cf, pi_gcf], [mpmath.e, 4 / mpmath.pi])
+            self.assertEqual(rates[0], calculate_convergence(e_cf, mpmath.e))
+            self.assertEqual(rates[1], calculate_convergence(pi_gcf, 4 / mpmath.pi))
+            self.assertGreater(rates[0], rates[1])
+            self.assertAlmostEqual(float(rates[1]), 0.7655, places=1)  # log10(3 + 2*sqrt(2))
@@ -0,0 +1,44 @@
+import os
+import json
+import tempfile
+from unittest import TestCase
+from ramanujan.utils.metrics import Metrics, JsonLinesExporter, PrometheusExporter
+
+
+class TestMetrics(TestCase):
+    def test_counters_and_stages(self):
+        metrics = Metrics({'enumerator': 'test'})
+        with metrics.stage('first_enumeration'):
+            metrics.increment('pairs_evaluated', 10)
+            metrics.increment('pairs_evaluated')
+        other = Metrics()
+        other.increment('pairs_evaluated', 5)
+        with other.stage('first_enumeration'):
+            pass
+        metrics.merge(other)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters'], {'pairs_evaluated': 16})
+        self.assertEqual(snapshot['stages']['first_enumeration']['calls'], 2)
+        prometheus = metrics.to_prometheus()
+        self.assertIn('ramanujan_pairs_evaluated_total{enumerator="test"} 16\n', prometheus)
+        self.assertIn('ramanujan_stage_calls_total{enumerator="test",stage="first_enumeration"} 2\n', prometheus)
+
+    def test_hooks(self):
+        metrics = Metrics()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, 'metrics.jsonl')
+            prometheus_path = os.path.join(tmp_dir, 'metrics.prom')
+            metrics.add_hook(JsonLinesExporter(json_path), interval=3600)
+            metrics.add_hook(PrometheusExporter(prometheus_path), interval=3600)
+            metrics.increment('results')
+            metrics.sample()  # interval has not passed yet
+            self.assertFalse(os.path.exists(json_path))
+            with metrics.stage('refine'):  # stages always sample
+                pass
+            metrics.sample(force=True)
+            with open(json_path) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(lines[-1]['counters'], {'results': 1})
+            with open(prometheus_path) as f:
+                self.assertEqual(f.read(), metrics.to_prometheus())
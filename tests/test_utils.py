@@ -0,0 +1,88 @@
+from fractions import Fraction
+from unittest import TestCase
+from ramanujan.utils.utils import get_reduced_fraction, get_poly_gcd, find_polynomial_series_coefficients, \
+    find_polynomial_series_coefficients_batch, create_linear_recurrence_series, create_linear_recurrence_series_batch
+
+
+class TestReducedFraction(TestCase):
+    def test_poly_gcd(self):
+        # (1 + k)(2 - 3k) and (1 + k)^2 * 4
+        self.assertEqual(get_poly_gcd([2, -1, -3], [4, 8, 4]), [1, 1])
+        self.assertEqual(get_poly_gcd([3, 6], [0, 0, 5]), [1])
+        self.assertEqual(get_poly_gcd([0, 0], [0, -2, 4]), [0, -1, 2])
+
+    def test_reduced_fraction(self):
+        self.assertEqual(get_reduced_fraction([1, 1, 0], [1, 2, 1], 2), ([1, 0, 0], [1, 1, 0]))
+        self.assertEqual(get_reduced_fraction([2, 2], [0, 4], 1), ([1, 1], [0, 2]))
+        self.assertEqual(get_reduced_fraction([-2, 0], [0, -4], 1), ([1, 0], [0, 2]))
+        self.assertEqual(get_reduced_fraction([1, 0], [1, -1], 1), ([-1, 0], [-1, 1]))
+        self.assertEqual(get_reduced_fraction([0, 0], [3, 1], 1), ([0, 0], [1, 0]))
+        # results of FR enumeration (PSLQ output) for zeta(3)
+        self.assertEqual(get_reduced_fraction([-108, 0], [448, -378], 1), ([54, 0], [-224, 189]))
+        self.assertEqual(get_reduced_fraction([0, 8, 0], [0, 0, 7], 2), ([8, 0, 0], [0, 7, 0]))
+
+    def test_sympy_outputs(self):
+        # outputs of the former sympy based reduction
+        sympy_outputs = [
+            (([-3, -7], [8, -9], 1), ([3, 7], [-8, 9])),
+            (([3, -7], [-7, -6], 1), ([-3, 7], [7, 6])),
+            (([8, -3], [-4, 7], 1), ([8, -3], [-4, 7])),
+            (([-2, -8], [-1, 6], 1), ([-2, -8], [-1, 6])),
+            (([2, -4], [0, 1], 1), ([2, -4], [0, 1])),
+            (([-4, 5, -9], [1, 1, -6], 2), ([-4, 5, -9], [1, 1, -6])),
+            (([6, 3, -3], [-4, 8, 8], 2), ([6, 3, -3], [-4, 8, 8])),
+            (([-6, 1, -6], [6, -8, -2], 2), ([6, -1, 6], [-6, 8, 2])),
+            (([2, 9, 2, 5], [0, -6, -6, 0], 3), ([-2, -9, -2, -5], [0, 6, 6, 0])),
+            (([3, -9, 3, 4], [-1, -9, -1, -8], 3), ([-3, 9, -3, -4], [1, 9, 1, 8])),
+            (([8, 0, 6, -6], [0, -5, 0, 1], 3), ([8, 0, 6, -6], [0, -5, 0, 1])),
+        ]
+        for args, output in sympy_outputs:
+            self.assertEqual(get_reduced_fraction(*args), output)
+
+    def test_sympy_differences(self):
+        # sympy chose the sign by its operation count: ([1, 5, 0], [-3, -7, 2]), ([7, 3, 0], [-5, -4, 5])
+        self.assertEqual(get_reduced_fraction([-1, -5, 0], [3, 7, -2], 2), ([-1, -5, 0], [3, 7, -2]))
+        self.assertEqual(get_reduced_fraction([7, 3, 0], [-5, -4, 5], 2), ([-7, -3, 0], [5, 4, -5]))
+        # sympy didn't reduce a power of k: ([0, 2, 5, -4], [0, 0, 0, 1]), ([0, -7, 4, 9], [0, 0, 0, 9])
+        self.assertEqual(get_reduced_fraction([-2, -5, 4], [0, 0, -1], 2), ([2, 5, -4], [0, 0, 1]))
+        self.assertEqual(get_reduced_fraction([7, -4, -9], [0, 0, -9], 2), ([-7, 4, 9], [0, 0, 9]))
+
+    def test_zero_denominator(self):
+        with self.assertRaises(ZeroDivisionError):
+            get_reduced_fraction([1, 2], [0, 0], 1)
+
+
+class TestPolynomialSeriesCoefficients(TestCase):
+    def test_small_degrees(self):
+        self.assertEqual(find_polynomial_series_coefficients(2, [3, 6, 11, 18]), [1, 2, 3])
+        self.assertEqual(find_polynomial_series_coefficients(1, [-1, -3], starting_n=1), [-2, 1])
+        self.assertEqual(find_polynomial_series_coefficients(2, [1, 2, 4]), [Fraction(1, 2), Fraction(1, 2), 1])
+        self.assertEqual(find_polynomial_series_coefficients_batch(1, [[0, 1], [5, 3], [2, 2]]),
+                         [[1, 0], [-2, 5], [0, 2]])
+
+    def test_large_degree(self):
+        # D(n) from test_large_catalan.test_8635, too large for floating point interpolation
+        coefs = [-627448373788702408704000, -5019586990309619269632000, -18391432395269564195143680,
+                 -40897254436468612147445760, -61658083472933792949207040, -66675401222598476546703360,
+                 -53351815000864249485721600, -32118344854440838966804480, -14642687844165168961822720,
+                 -5046538144294635372052480, -1301883449482921019688960, -246576812550898187868160,
+                 -33208257773591953443840, -3022272220593959055360, -171197085947887604160, -5258480264411774400,
+                 -68131803107993625]
+        terms = [sum(c * n ** (16 - i) for i, c in enumerate(coefs)) for n in range(17)]
+        self.assertEqual(find_polynomial_series_coefficients(16, terms), coefs)
+
+
+class TestLinearRecurrenceSeries(TestCase):
+    def test_series(self):
+        self.assertEqual(create_linear_recurrence_series([1, -1, -1], [1, 1], 8), [1, 1, 2, 3, 5, 8, 13, 21])
+        self.assertEqual(create_linear_recurrence_series([1, -3, 3, -1], [1, 4, 9], 6), [1, 4, 9, 16, 25, 36])
+        self.assertEqual(create_linear_recurrence_series([1, 0, -1], [2, -5], 5), [2, -5, 2, -5, 2])
+
+    def test_batch(self):
+        shift_regs = [[1, -2, 1]] * 5 + [[1, -3, 3, -1]] * 4 + [[1, -1, -1]] + [[1, -2, 1]] * 3
+        initials = [[i, 2 * i - 3] for i in range(5)] + [[1, 4, 9], [0, 0, 1], [10 ** 20, 0, -7], [5, 5, 5]] + \
+                   [[1, 1]] + [[-i, i ** 3] for i in range(3)]
+        expected = [create_linear_recurrence_series(p, a, 300) for p, a in zip(shift_regs, initials)]
+        self.assertEqual(create_linear_recurrence_series_batch(shift_regs, initials, 300), expected)
+        # degree 0 shift registers have no initial conditions (and no basis)
+        self.assertEqual(create_linear_recurrence_series_batch([[1], [1]], [[], []], 5), [[0] * 5] * 2)